@@ -853,7 +853,7 @@ def render_sidebar(db_manager, ingestion_manager, chat_assistant):
             
             try:
                 with st.spinner("🔬 Reprocessing all images with AI vision analysis..."):
-                    # This will clear all data and reprocess everything with current vision settings
+                    # This will clear all dataset data (chat history is kept) and reprocess everything with current vision settings
                     result = ingestion_manager.force_reprocess_all()
                     if result['status'] == 'success':
                         st.sidebar.success(f"✅ Reprocessed {result.get('total_images', 0)} images with AI vision analysis!")
@@ -180,7 +180,8 @@ class UnifiedAIClient:
         Args:
             image_path: Path to the image file
             prompt: Text prompt for analysis
-            **kwargs: Additional parameters
+            **kwargs: Additional parameters (image_bytes overrides reading image_path,
+                      detail sets the OpenAI image detail level)
         
         Returns:
             Standardized response dict
@@ -198,9 +199,12 @@ class UnifiedAIClient:
             if 'gpt-4' not in vision_model and 'gpt-4o' not in vision_model:
                 raise ValueError(f"Model {vision_model} does not support vision")
             
-            # Read and encode image
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            # Read and encode image (callers may pass pre-processed bytes instead of the raw file)
+            image_bytes = kwargs.get('image_bytes')
+            if image_bytes is None:
+                with open(image_path, "rb") as image_file:
+                    image_bytes = image_file.read()
+            base64_image = base64.b64encode(image_bytes).decode('utf-8')
             
             messages = [
                 {
@@ -211,7 +215,7 @@ class UnifiedAIClient:
                             "type": "image_url",
                             "image_url": {
                                 "url": f"data:image/jpeg;base64,{base64_image}",
-                                "detail": "high"
+                                "detail": kwargs.get('detail', 'high')
                             }
                         }
                     ]
@@ -244,8 +248,9 @@ class UnifiedAIClient:
     def _analyze_image_gemini(self, image_path: str, prompt: str, **kwargs) -> Dict[str, Any]:
         """Analyze image using Gemini Vision via direct API"""
         try:
-            # Read and process the image
-            image = Image.open(image_path)
+            # Read and process the image (callers may pass pre-processed bytes instead of the raw file)
+            image_bytes = kwargs.get('image_bytes')
+            image = Image.open(io.BytesIO(image_bytes) if image_bytes is not None else image_path)
             
             # Set generation config
             generation_config = genai.GenerationConfig(
@@ -3,21 +3,38 @@ import hashlib
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 import json
 from fuzzywuzzy import fuzz
 import pandas as pd
 
+# Bytes of the database file SQLite may memory-map on write connections
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+# Separators dropped from names before fuzzy matching
+_NAME_SEPARATOR_DELETIONS = str.maketrans('', '', ' _-')
+
 class DatabaseManager:
     def __init__(self, db_path: str = "clinical_analyzer.db"):
         self.db_path = db_path
         self.init_database()
     
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection tuned for write bursts (WAL itself is persisted by init_database)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        return conn
+    
     def init_database(self):
         """Initialize the database with required tables"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
+            # Write-ahead logging lets readers proceed during writes and makes commits cheaper
+            cursor.execute('PRAGMA journal_mode=WAL')
+            
             # Patients table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS patients (
@@ -104,7 +121,7 @@ class DatabaseManager:
         """Normalize text for fuzzy matching"""
         if not text:
             return ""
-        return text.lower().strip().replace(" ", "").replace("_", "").replace("-", "")
+        return text.lower().strip().translate(_NAME_SEPARATOR_DELETIONS)
     
     def calculate_file_hash(self, file_path: str) -> str:
         """Calculate MD5 hash of file"""
@@ -182,9 +199,40 @@ class DatabaseManager:
             
             return False
     
-    def mark_file_processed(self, file_path: str):
+    def get_processed_set(self, file_paths: List[str]) -> Set[str]:
+        """Return the subset of file paths that have been processed and haven't changed"""
+        stored = {}
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            # Query in chunks to stay under SQLite's bound-parameter limit
+            for start in range(0, len(file_paths), 500):
+                chunk = file_paths[start:start + 500]
+                cursor.execute(f'''
+                    SELECT file_path, file_hash, last_modified FROM file_status 
+                    WHERE file_path IN ({','.join('?' * len(chunk))})
+                ''', chunk)
+                for file_path, stored_hash, stored_mtime in cursor.fetchall():
+                    stored[file_path] = (stored_hash, stored_mtime)
+        
+        processed = set()
+        for file_path, (stored_hash, stored_mtime) in stored.items():
+            # Only hash files whose modification time still matches
+            if (os.path.getmtime(file_path) == stored_mtime and
+                    self.calculate_file_hash(file_path) == stored_hash):
+                processed.add(file_path)
+        return processed
+    
+    def get_last_content_hash(self, file_path: str) -> Optional[str]:
+        """Get the content hash recorded when the file was last processed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT file_hash FROM file_status WHERE file_path = ?', (file_path,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+    
+    def mark_file_processed(self, file_path: str, content_hash: Optional[str] = None):
         """Mark file as processed"""
-        file_hash = self.calculate_file_hash(file_path)
+        file_hash = content_hash or self.calculate_file_hash(file_path)
         file_mtime = os.path.getmtime(file_path)
         
         with sqlite3.connect(self.db_path) as conn:
@@ -266,6 +314,74 @@ class DatabaseManager:
                 ''', (transcription, image_category, json.dumps(metadata or {}), file_hash))
                 conn.commit()
     
+    def _mark_files_processed_bulk(self, cursor: sqlite3.Cursor, file_hashes: Dict[str, str]):
+        """Record file_status rows for already-hashed files on an open cursor"""
+        cursor.executemany('''
+            INSERT OR REPLACE INTO file_status (file_path, file_hash, last_modified)
+            VALUES (?, ?, ?)
+        ''', [(file_path, file_hash, os.path.getmtime(file_path)) for file_path, file_hash in file_hashes.items()])
+    
+    def add_documents_bulk(self, documents: List[Dict[str, Any]]):
+        """Add many documents (add_document keyword dicts) in one transaction, updating existing ones"""
+        source_hashes = {}
+        processed_files = {}
+        rows = []
+        for document in documents:
+            file_path = document['file_path']
+            # Handle virtual file paths (Excel rows) differently
+            if '#row_' in file_path:
+                actual_file_path = file_path.split('#')[0]  # Get the actual Excel file path
+                if actual_file_path not in source_hashes:
+                    source_hashes[actual_file_path] = self.calculate_file_hash(actual_file_path)
+                file_hash = source_hashes[actual_file_path] + f"#{file_path.split('#')[1]}"  # Unique hash per row
+            else:
+                file_hash = self.calculate_file_hash(file_path)
+                processed_files[file_path] = file_hash
+            
+            metadata = document.get('metadata')
+            rows.append((document['patient_uuid'], file_path, os.path.basename(file_path),
+                         Path(file_path).suffix.lower(), file_hash, document['content'],
+                         document.get('processed_content'), json.dumps(metadata) if metadata else None))
+        
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO documents (
+                    patient_uuid, file_path, file_name, file_type, 
+                    file_hash, content, processed_content, metadata
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(file_hash) DO UPDATE SET
+                    content = excluded.content, processed_content = excluded.processed_content,
+                    metadata = excluded.metadata, updated_at = CURRENT_TIMESTAMP
+            ''', rows)
+            # Only mark actual files as processed, not virtual rows
+            self._mark_files_processed_bulk(cursor, processed_files)
+            conn.commit()
+    
+    def add_images_bulk(self, images: List[Dict[str, Any]]):
+        """Add many image transcriptions (add_image keyword dicts) in one transaction, updating existing ones"""
+        file_hashes = {}
+        rows = []
+        for image in images:
+            file_path = image['file_path']
+            file_hash = file_hashes.get(file_path) or self.calculate_file_hash(file_path)
+            file_hashes[file_path] = file_hash
+            rows.append((image['patient_uuid'], file_path, os.path.basename(file_path), file_hash,
+                         image['transcription'], image.get('image_category'), json.dumps(image.get('metadata') or {})))
+        
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO images (patient_uuid, file_path, file_name, file_hash, 
+                                  transcription, image_category, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(file_hash) DO UPDATE SET
+                    transcription = excluded.transcription, image_category = excluded.image_category,
+                    metadata = excluded.metadata, updated_at = CURRENT_TIMESTAMP
+            ''', rows)
+            self._mark_files_processed_bulk(cursor, file_hashes)
+            conn.commit()
+    
     def get_patient_data(self, patient_name: str = None, patient_id: str = None) -> Dict:
         """Get all data for a specific patient"""
         if not patient_name and not patient_id:
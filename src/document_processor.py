@@ -5,18 +5,339 @@ from docx import Document
 import fitz
 import json
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import re
 from PIL import Image
 import pytesseract
 import base64
 import io
 import hashlib
+import mmap
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait, TimeoutError as FutureTimeoutError
 from .ai_client import UnifiedAIClient
 
+# Patient info regex fallback: patterns are compiled once and tried in priority order
+_WHITESPACE_RE = re.compile(r'\s+')
+_DIGITS_ONLY_RE = re.compile(r'^\d+$')
+_NAME_FALSE_POSITIVES = frozenset({'id', 'transcription', 'description', 'path', 'image'})
+
+# Common patterns for patient names - more specific and ordered by priority
+_NAME_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'Patient\s+Name\s*:?\s*([A-Za-z][A-Za-z\s]+?)(?:\s|$|,|\n)',  # Patient Name: John Smith
+    r'Name\s*:?\s*([A-Za-z][A-Za-z\s]+?)(?:\s|$|,|\n)',            # Name: John Smith
+    r'Patient\s*:?\s*([A-Za-z][A-Za-z\s]+?)(?:\s|$|,|\n)',         # Patient: John Smith
+    r'(?:Mr|Mrs|Ms|Dr)\.?\s+([A-Za-z][A-Za-z\s]+?)(?:\s|$|,|\n)',  # Mr. John Smith
+))
+
+# Common patterns for patient IDs - more specific; the bare code pattern must stay last
+_ID_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'Patient\s*ID\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',           # PATIENT ID: M0001
+    r'Medical\s*Record\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',       # Medical Record: 123456
+    r'MR\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',                     # MR: 123456
+    r'Record\s*Number\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',        # Record Number: 123456
+    r'ID\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',                     # ID: M0001 (but not "Image ID")
+    r'\b([A-Z]{1,3}[-_]?\d{3,6})\b',                              # Pattern like MT-0006, M0001, etc.
+))
+
+# Single-pass prefilters over the anchor keywords of the patterns above
+_NAME_KEYWORDS_RE = re.compile(r'Patient|Name|(?:Mr|Mrs|Ms|Dr)\.?\s', re.IGNORECASE)
+_ID_KEYWORDS_RE = re.compile(r'ID|MR|Record', re.IGNORECASE)
+
+# Image file extensions handled by the processor
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+
+# Placeholder transcriptions that carry no extracted text
+_EMPTY_TRANSCRIPTIONS = frozenset({
+    "No text detected in image",
+    "Google Vision API not configured",
+    "Text extraction failed",
+})
+
+# Static parts of the patient-context enhancement prompt (indentation kept from the original inline prompt)
+_ENHANCEMENT_PROMPT_HEAD = """
+            You are analyzing a medical image for a known patient. Provide a comprehensive analysis that combines:
+            1. The image transcription
+            2. The known patient information
+            3. Clinical context from their medical records
+            
+            PATIENT INFORMATION:
+            """
+_ENHANCEMENT_PROMPT_TAIL = """
+            
+            Please provide a structured analysis including:
+            - Patient identification
+            - Image type and findings
+            - Relevant observations from the transcription
+            - Correlation with clinical context (if available)
+            - Key medical findings or abnormalities noted
+            
+            Format as a clear, structured medical report.
+            """
+
+# Completion token bounds for the enhancement call
+ENHANCEMENT_MIN_TOKENS = 256
+ENHANCEMENT_MAX_TOKENS = 1500
+
+# Separator line used in enhanced image transcriptions
+_SEP = "=" * 50
+
+# Google Vision batch_annotate_images limits (images per call, total request payload)
+VISION_BATCH_MAX_IMAGES = 16
+VISION_BATCH_MAX_BYTES = 8 * 1024 * 1024
+
+# AI Vision payload preprocessing: longest edge in pixels, JPEG quality and OpenAI detail level
+VISION_MAX_EDGE = 2048
+VISION_JPEG_QUALITY = 85
+VISION_DETAIL = "low"
+
+# Retry policy for transient API failures (rate limits, quota, timeouts, 5xx)
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+_RETRYABLE_ERROR_RE = re.compile(
+    r'\b(?:429|500|502|503|504)\b|rate.?limit|quota|timeout|timed out|unavailable|resource.?exhausted|overloaded',
+    re.IGNORECASE
+)
+
+# Client-side throttling: requests/second, burst size and max in-flight calls per API
+GOOGLE_VISION_RATE_LIMIT = 20
+GOOGLE_VISION_BURST = 10
+GOOGLE_VISION_MAX_CONCURRENT = 5
+AI_VISION_RATE_LIMIT = 5
+AI_VISION_BURST = 5
+AI_VISION_MAX_CONCURRENT = 5
+
+# AI Vision provider fallback: comma-separated providers tried after the primary one,
+# with a per-attempt timeout (seconds) applied whenever another provider is left to try
+AI_VISION_FALLBACK_PROVIDERS_ENV = "AI_VISION_FALLBACK_PROVIDERS"
+AI_VISION_PROVIDER_TIMEOUT = 30
+
+# Hedged AI Vision: seconds to wait on the running provider before racing the next one
+AI_VISION_HEDGING_ENV = "AI_VISION_HEDGING"
+AI_VISION_HEDGE_DELAY = 5
+_FALLBACK_VISION_CONFIG = {
+    'openai': {'api_key_env': 'OPENAI_API_KEY', 'model': 'gpt-4o'},
+    'gemini': {'api_key_env': 'GEMINI_API_KEY', 'model_env': 'GEMINI_MODEL', 'model': 'gemini-1.5-flash'},
+}
+
+# Opt-in on-disk memo of transcribe_and_analyze_image and enhance_text_with_ai results. It holds patient
+# data, so it is only kept when a path is configured: location, retention and the minimum image analysis
+# duration worth persisting (cheap results are simply recomputed)
+MEMO_DB_PATH_ENV = "IMAGE_ANALYSIS_MEMO_PATH"
+MEMO_TTL_SECONDS = 30 * 24 * 60 * 60
+MEMO_MIN_DURATION = 0.1
+
+# In-memory result cache sizes (entries) for content-hash keyed image analysis
+OCR_CACHE_SIZE = 256
+VISION_CACHE_SIZE = 256
+ENHANCEMENT_CACHE_SIZE = 256
+ENHANCEMENT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+TEXT_ENHANCEMENT_CACHE_SIZE = 4096
+TEXT_ENHANCEMENT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Characters of the source text sent to enhance_text_with_ai (also bounds its cache key)
+TEXT_ENHANCEMENT_INPUT_CHARS = 3000
+
+
+class _VisionUnavailable(Exception):
+    """No vision-capable AI provider is configured, so no visual analysis was produced"""
+
+
+class _LRUCache:
+    """Small thread-safe LRU mapping used to memoize expensive API results"""
+
+    def __init__(self, maxsize: int, max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self._bytes -= len(self._data[key])
+            self._data[key] = value
+            self._bytes += len(value)
+            self._data.move_to_end(key)
+            # Evict least recently used entries until both the count and size bounds hold
+            while len(self._data) > self.maxsize or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes and len(self._data) > 1):
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+
+class _DiskMemo:
+    """SQLite-backed key -> JSON store so expensive analyses survive app restarts"""
+
+    def __init__(self, db_path: str, ttl_seconds: float):
+        self.db_path = os.path.expanduser(db_path)
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS memo (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+
+    def get(self, key: str) -> Optional[Dict]:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                'SELECT value FROM memo WHERE key = ? AND created_at >= ?',
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Dict):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO memo (key, value, created_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time())
+            )
+
+    def clear(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('DELETE FROM memo')
+
+
+class _ApiThrottle:
+    """Caps in-flight API calls with a semaphore and smooths the request rate with a token bucket"""
+
+    def __init__(self, rate: float, burst: int, max_concurrent: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+
+    def _take(self, cost: int):
+        # Wait for at least one token; larger costs (batch calls) are taken as debt the bucket refills later
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= cost
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def call(self, fn, *args, cost: int = 1, **kwargs):
+        """Run fn once a concurrency slot and rate-limit token are available"""
+        with self._semaphore:
+            self._take(cost)
+            return fn(*args, **kwargs)
+
+
+# Shared across processor instances because the provider quotas are per project/key
+_GOOGLE_VISION_THROTTLE = _ApiThrottle(GOOGLE_VISION_RATE_LIMIT, GOOGLE_VISION_BURST, GOOGLE_VISION_MAX_CONCURRENT)
+_AI_VISION_THROTTLE = _ApiThrottle(AI_VISION_RATE_LIMIT, AI_VISION_BURST, AI_VISION_MAX_CONCURRENT)
+
+
+# Medical imaging keywords looked for in path components (case-insensitive), in priority order
+_MEDICAL_IMAGE_KEYWORDS = {
+    'ct': 'CT Scan',
+    'mri': 'MRI',
+    'xray': 'X-Ray',
+    'cxr': 'Chest X-Ray',
+    'ultrasound': 'Ultrasound',
+    'echo': 'Echocardiogram',
+    'mammogram': 'Mammogram',
+    'abdomen': 'Abdominal Imaging',
+    'chest': 'Chest Imaging',
+    'head': 'Head Imaging',
+    'brain': 'Brain Imaging',
+    'spine': 'Spine Imaging',
+    'hand': 'Hand Imaging',
+    'foot': 'Foot Imaging',
+    'breast': 'Breast Imaging',
+    'cardiac': 'Cardiac Imaging',
+    'lung': 'Lung Imaging',
+    'liver': 'Liver Imaging',
+    'kidney': 'Kidney Imaging'
+}
+
+
+@lru_cache(maxsize=4096)
+def _image_category_for_path(image_path: str) -> str:
+    """Derive an image category from the folder and file names in a path (pure, so memoized per path)"""
+    path_parts = Path(image_path).parts
+    
+    # Check each part of the path for medical keywords
+    for part in path_parts:
+        part_lower = part.lower()
+        for keyword, category in _MEDICAL_IMAGE_KEYWORDS.items():
+            if keyword in part_lower:
+                return category
+    
+    # Try to extract from common folder naming patterns
+    for part in path_parts:
+        part_lower = part.lower()
+        # Look for patterns like "CT_Scans", "MRI_Images", etc.
+        if 'ct' in part_lower and ('scan' in part_lower or 'image' in part_lower):
+            return 'CT Scan'
+        elif 'mri' in part_lower:
+            return 'MRI'
+        elif 'xray' in part_lower or 'x-ray' in part_lower:
+            return 'X-Ray'
+        elif 'ultrasound' in part_lower or 'us' in part_lower:
+            return 'Ultrasound'
+    
+    # If no specific category found, use the parent folder name
+    if len(path_parts) > 1:
+        parent_folder = path_parts[-2]  # Get immediate parent folder
+        return f"Medical Image - {parent_folder}"
+    
+    return 'Medical Image - Uncategorized'
+
+
+def _enhancement_max_tokens(transcription: str, clinical_context: str) -> int:
+    """Scale the enhancement completion budget with the input size (about 4 characters per token)"""
+    input_tokens = (len(transcription) + len(clinical_context)) // 4
+    return min(ENHANCEMENT_MAX_TOKENS, max(ENHANCEMENT_MIN_TOKENS, 3 * input_tokens + 300))
+
+
+def _content_hash(content: bytes) -> str:
+    """Return a short BLAKE2b digest identifying file content"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _file_content_hash(file_path: str) -> str:
+    """Hash a file through a read-only memory map instead of copying its bytes into memory"""
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return _content_hash(b'')
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return _content_hash(mapped)
+
+
 class DocumentProcessor:
     def __init__(self, ai_provider: str = "openai", api_key: str = None, model: str = None,
-                 google_vision_key_path: str = "key.json", **kwargs):
+                 google_vision_key_path: str = "key.json", vision_fallback_providers: List[str] = None,
+                 enable_hedging: bool = None, memo_path: str = None, **kwargs):
         """Initialize the document processor with unified AI client and optional Google Vision API"""
         
         normalized_provider = ai_provider.lower()
@@ -53,6 +374,73 @@ class DocumentProcessor:
         else:
             print(f"Warning: Google Vision API key file not found at {google_vision_key_path}")
             self.vision_client = None
+        
+        # Ordered (provider, client) pairs for AI Vision: the primary client first, then configured fallbacks
+        self.ai_provider_chain = []
+        if self.ai_client is not None:
+            self.ai_provider_chain.append((self.ai_provider, self.ai_client))
+        if vision_fallback_providers is None:
+            vision_fallback_providers = os.getenv(AI_VISION_FALLBACK_PROVIDERS_ENV, '').split(',')
+        for provider in vision_fallback_providers:
+            fallback_client = self._init_fallback_vision_client(provider.strip().lower())
+            if fallback_client is not None:
+                self.ai_provider_chain.append((provider.strip().lower(), fallback_client))
+        self._vision_executor = ThreadPoolExecutor(max_workers=AI_VISION_MAX_CONCURRENT)
+        
+        # Hedging trades extra provider calls for lower tail latency, so it is opt-in
+        if enable_hedging is None:
+            enable_hedging = os.getenv(AI_VISION_HEDGING_ENV, 'false').lower() == 'true'
+        self.enable_hedging = enable_hedging
+        
+        # File extension -> handler used by process_file
+        self._ext_dispatch = self._build_ext_dispatch()
+        
+        # Image results keyed by content hash so re-analysing the same image skips the API round-trip
+        self._ocr_cache = _LRUCache(OCR_CACHE_SIZE)
+        self._vision_cache = _LRUCache(VISION_CACHE_SIZE)
+        self._enhancement_cache = _LRUCache(ENHANCEMENT_CACHE_SIZE, ENHANCEMENT_CACHE_MAX_BYTES)
+        self._text_enhancement_cache = _LRUCache(TEXT_ENHANCEMENT_CACHE_SIZE, TEXT_ENHANCEMENT_CACHE_MAX_BYTES)
+        
+        # Persistent memo of full image analyses, only when a location is configured; analysis works without it
+        self._disk_memo = None
+        memo_path = memo_path or os.getenv(MEMO_DB_PATH_ENV)
+        if memo_path:
+            try:
+                self._disk_memo = _DiskMemo(memo_path, MEMO_TTL_SECONDS)
+            except Exception as e:
+                print(f"Warning: Image analysis memo unavailable: {e}")
+    
+    def clear_cache(self):
+        """Drop all cached OCR, vision, image and text enhancement results, including the on-disk memo"""
+        self._ocr_cache.clear()
+        self._vision_cache.clear()
+        self._enhancement_cache.clear()
+        self._text_enhancement_cache.clear()
+        if self._disk_memo is not None:
+            self._disk_memo.clear()
+    
+    def _vision_chain_signature(self) -> str:
+        """Identify the primary model and every fallback vision provider/model, in order"""
+        return ",".join([f"{self.ai_provider}:{self.model}"] +
+                        [f"{provider}:{client.model}" for provider, client in self.ai_provider_chain])
+    
+    def _init_fallback_vision_client(self, provider: str) -> Optional[UnifiedAIClient]:
+        """Create an AI client for a fallback vision provider, or None if it is unknown or unconfigured"""
+        if not provider or provider == self.ai_provider:
+            return None
+        config = _FALLBACK_VISION_CONFIG.get(provider)
+        if config is None:
+            print(f"Warning: Unsupported AI Vision fallback provider: {provider}")
+            return None
+        try:
+            return UnifiedAIClient(
+                provider=provider,
+                api_key=os.getenv(config['api_key_env']),
+                model=os.getenv(config.get('model_env', ''), config['model'])
+            )
+        except Exception as e:
+            print(f"Warning: AI Vision fallback provider {provider} unavailable: {e}")
+            return None
     
     def extract_patient_info_from_text(self, text: str, use_ai: bool = False) -> Dict[str, str]:
         """Extract patient name and ID from text using AI or regex fallback"""
@@ -102,41 +490,25 @@ class DocumentProcessor:
         patient_id = ""
         
         # Clean up the text by removing extra whitespace and newlines
-        text = re.sub(r'\s+', ' ', text.strip())
-        
-        # Common patterns for patient names - more specific and ordered by priority
-        name_patterns = [
-            r'Patient\s+Name\s*:?\s*([A-Za-z][A-Za-z\s]+?)(?:\s|$|,|\n)',  # Patient Name: John Smith
-            r'Name\s*:?\s*([A-Za-z][A-Za-z\s]+?)(?:\s|$|,|\n)',            # Name: John Smith
-            r'Patient\s*:?\s*([A-Za-z][A-Za-z\s]+?)(?:\s|$|,|\n)',         # Patient: John Smith
-            r'(?:Mr|Mrs|Ms|Dr)\.?\s+([A-Za-z][A-Za-z\s]+?)(?:\s|$|,|\n)',  # Mr. John Smith
-        ]
+        text = _WHITESPACE_RE.sub(' ', text.strip())
         
-        # Common patterns for patient IDs - more specific
-        id_patterns = [
-            r'Patient\s*ID\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',           # PATIENT ID: M0001
-            r'Medical\s*Record\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',       # Medical Record: 123456
-            r'MR\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',                     # MR: 123456
-            r'Record\s*Number\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',        # Record Number: 123456
-            r'ID\s*:?\s*([A-Za-z0-9-]+?)(?:\s|$|\n)',                     # ID: M0001 (but not "Image ID")
-            r'\b([A-Z]{1,3}[-_]?\d{3,6})\b',                              # Pattern like MT-0006, M0001, etc.
-        ]
+        # Extract patient name (every name pattern is keyword-anchored, so skip them all when no keyword is present)
+        if _NAME_KEYWORDS_RE.search(text):
+            for pattern in _NAME_PATTERNS:
+                match = pattern.search(text)
+                if match:
+                    name_candidate = match.group(1).strip()
+                    # Filter out common false positives
+                    if (len(name_candidate) > 1 and 
+                        not _DIGITS_ONLY_RE.match(name_candidate) and  # Not just numbers
+                        not name_candidate.lower() in _NAME_FALSE_POSITIVES):
+                        patient_name = name_candidate
+                        break
         
-        # Extract patient name
-        for pattern in name_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                name_candidate = match.group(1).strip()
-                # Filter out common false positives
-                if (len(name_candidate) > 1 and 
-                    not re.match(r'^\d+$', name_candidate) and  # Not just numbers
-                    not name_candidate.lower() in ['id', 'transcription', 'description', 'path', 'image']):
-                    patient_name = name_candidate
-                    break
-        
-        # Extract patient ID with better filtering
+        # Extract patient ID with better filtering (only the bare code pattern runs without a keyword)
+        id_patterns = _ID_PATTERNS if _ID_KEYWORDS_RE.search(text) else _ID_PATTERNS[-1:]
         for pattern in id_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
                 id_candidate = match.group(1).strip()
                 # Make sure it's not part of "Image ID" or similar
@@ -415,14 +787,34 @@ class DocumentProcessor:
     def analyze_image_with_ai_vision(self, image_path: str, patient_name: str = "", 
                                    patient_id: str = "", clinical_context: str = "") -> str:
         """Analyze medical image using unified AI vision capabilities"""
-        if self.ai_client is None:
-            return f"Vision analysis not available with current AI configuration for patient {patient_name or 'N/A'}"
         try:
-            # Determine image category
-            image_category = self._get_image_category(image_path)
-            
-            # Create comprehensive prompt for medical image analysis
-            prompt = f"""You are a medical AI assistant analyzing a medical image. Please provide a detailed analysis.
+            return self._analyze_image_ai_vision(image_path, patient_name, patient_id, clinical_context)
+        except _VisionUnavailable as e:
+            return str(e)
+        except Exception as e:
+            print(f"Error analyzing image with AI Vision: {e}")
+            return f"Error analyzing image with AI Vision: {str(e)}"
+    
+    def _analyze_image_ai_vision(self, image_path: str, patient_name: str = "", 
+                                 patient_id: str = "", clinical_context: str = "",
+                                 image_bytes: Optional[bytes] = None) -> str:
+        """AI vision analysis that raises on failure (_VisionUnavailable without a vision provider)"""
+        if not self.ai_provider_chain:
+            raise _VisionUnavailable(
+                f"Vision analysis not available with current AI configuration for patient {patient_name or 'N/A'}")
+        # Determine image category (from the path, so identical bytes elsewhere can differ)
+        image_category = self._get_image_category(image_path)
+        
+        # Reuse a previous analysis of the same image content, category and context
+        image_hash = _content_hash(image_bytes) if image_bytes is not None else _file_content_hash(image_path)
+        cache_key = (image_hash, image_category, self.ai_provider, self.model, patient_name, patient_id,
+                     _content_hash(clinical_context.encode('utf-8')))
+        cached_analysis = self._vision_cache.get(cache_key)
+        if cached_analysis is not None:
+            return cached_analysis
+        
+        # Create comprehensive prompt for medical image analysis
+        prompt = f"""You are a medical AI assistant analyzing a medical image. Please provide a detailed analysis.
 
 PATIENT INFORMATION:
 - Name: {patient_name}
@@ -457,59 +849,247 @@ Please analyze this medical image and provide:
 
 Please be thorough but acknowledge that this is an AI analysis and should be reviewed by qualified medical professionals."""
 
-            # Use unified AI client for image analysis
-            if self.ai_client.supports_vision():
-                ai_response = self.ai_client.analyze_image(
-                    image_path=image_path,
-                    prompt=prompt,
-                    max_tokens=1500,
-                    temperature=0.1
-                )
-                
-                analysis = ai_response['content']
-                
-                # Format the response with patient info
-                formatted_analysis = f"""
+        # Try each vision-capable provider in order, falling back on failure or timeout
+        vision_providers = [(provider, client) for provider, client in self.ai_provider_chain
+                            if client.supports_vision()]
+        if not vision_providers:
+            raise _VisionUnavailable(
+                f"Vision analysis not supported with current AI configuration for patient {patient_name}")
+        
+        image_bytes = self._prepare_vision_payload(image_path, image_bytes)
+        if self.enable_hedging and len(vision_providers) > 1:
+            provider, analysis = self._analyze_hedged(vision_providers, image_path, prompt, image_bytes)
+        else:
+            provider, analysis = self._analyze_with_fallback(vision_providers, image_path, prompt, image_bytes)
+        
+        # Format the response with patient info
+        formatted_analysis = f"""
 PATIENT: {patient_name} (ID: {patient_id})
 IMAGE TYPE: {image_category}
-AI VISUAL ANALYSIS ({self.ai_provider.upper()}):
+AI VISUAL ANALYSIS ({provider.upper()}):
 
 {analysis}
 
 ---
-Note: This analysis was generated using {self.ai_provider.upper()} vision technology and should be reviewed by qualified medical professionals.
+Note: This analysis was generated using {provider.upper()} vision technology and should be reviewed by qualified medical professionals.
 """
-                return formatted_analysis
-                
-            else:
-                return f"Vision analysis not supported with current AI configuration for patient {patient_name}"
-                
+        self._vision_cache.put(cache_key, formatted_analysis)
+        return formatted_analysis
+    
+    def _submit_vision_call(self, client: UnifiedAIClient, image_path: str, prompt: str, image_bytes: bytes,
+                            started: Optional[threading.Event] = None) -> Future:
+        """Submit one provider's vision call (with retry and throttling); started is set once the call itself begins"""
+        def analyze_image(**kwargs):
+            if started is not None:
+                started.set()
+            return client.analyze_image(**kwargs)
+        
+        return self._vision_executor.submit(
+            self._retry,
+            _AI_VISION_THROTTLE.call,
+            analyze_image,
+            image_path=image_path,
+            prompt=prompt,
+            max_tokens=1500,
+            temperature=0.1,
+            image_bytes=image_bytes,
+            detail=VISION_DETAIL
+        )
+    
+    def _analyze_with_fallback(self, vision_providers: List[Tuple[str, UnifiedAIClient]], image_path: str,
+                               prompt: str, image_bytes: bytes) -> Tuple[str, str]:
+        """Try providers one after another, moving on after a failure or timeout; returns (provider, analysis)"""
+        last_error = None
+        for position, (provider, client) in enumerate(vision_providers):
+            has_fallback = position < len(vision_providers) - 1
+            timeout = AI_VISION_PROVIDER_TIMEOUT if has_fallback else None
+            started = threading.Event()
+            future = self._submit_vision_call(client, image_path, prompt, image_bytes, started)
+            try:
+                # Time spent queued behind other rows' calls does not count against the provider
+                if timeout is not None:
+                    while not started.wait(1.0) and not future.done():
+                        pass
+                return provider, future.result(timeout=timeout)['content']
+            except FutureTimeoutError:
+                future.cancel()
+                last_error = TimeoutError(f"{provider.upper()} vision call timed out after {timeout}s")
+            except Exception as e:
+                last_error = e
+            if has_fallback:
+                print(f"AI Vision provider {provider.upper()} failed, trying next provider: {last_error}")
+        raise last_error
+    
+    def _analyze_hedged(self, vision_providers: List[Tuple[str, UnifiedAIClient]], image_path: str,
+                        prompt: str, image_bytes: bytes) -> Tuple[str, str]:
+        """Race providers: start the next one whenever the running calls are slow or fail, keep the first success"""
+        remaining = list(vision_providers)
+        pending = {}
+        last_error = None
+        latest_started = []
+        
+        def start_next():
+            provider, client = remaining.pop(0)
+            started = threading.Event()
+            pending[self._submit_vision_call(client, image_path, prompt, image_bytes, started)] = provider
+            latest_started[:] = [started]
+        
+        start_next()
+        while pending:
+            # The hedge delay runs from when the newest call starts, not while it is queued behind other rows
+            if remaining:
+                while not latest_started[0].wait(1.0) and not any(future.done() for future in pending):
+                    pass
+            done, _ = wait(pending, timeout=AI_VISION_HEDGE_DELAY if remaining else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"AI Vision providers slow after {AI_VISION_HEDGE_DELAY}s, hedging with {remaining[0][0].upper()}")
+                start_next()
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    analysis = future.result()['content']
+                except Exception as e:
+                    last_error = e
+                    print(f"AI Vision provider {provider.upper()} failed: {e}")
+                    continue
+                for other in pending:
+                    other.cancel()
+                return provider, analysis
+            if not pending and remaining:
+                start_next()
+        raise last_error
+    
+    def _retry(self, fn, *args, **kwargs):
+        """Call fn, retrying transient API errors with jittered exponential backoff"""
+        for attempt in range(1, RETRY_MAX_ATTEMPTS + 1):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == RETRY_MAX_ATTEMPTS or not _RETRYABLE_ERROR_RE.search(str(e)):
+                    raise
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+                delay = random.uniform(delay / 2, delay)
+                print(f"Transient API error (attempt {attempt}/{RETRY_MAX_ATTEMPTS}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+    
+    def _prepare_vision_payload(self, image_path: str, image_bytes: Optional[bytes] = None) -> bytes:
+        """Downscale and JPEG-recompress an image so the vision model is not sent full-resolution pixels"""
+        if image_bytes is None:
+            with open(image_path, 'rb') as image_file:
+                image_bytes = image_file.read()
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                # Small JPEGs are already a compact payload
+                if image.format == 'JPEG' and max(image.size) <= VISION_MAX_EDGE:
+                    return image_bytes
+                image.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.LANCZOS)
+                if image.mode != 'RGB':
+                    image = image.convert('RGB')
+                buffer = io.BytesIO()
+                image.save(buffer, 'JPEG', quality=VISION_JPEG_QUALITY, optimize=True)
+                return buffer.getvalue()
         except Exception as e:
-            print(f"Error analyzing image with AI Vision: {e}")
-            return f"Error analyzing image with AI Vision: {str(e)}"
+            print(f"Error preparing vision payload for {image_path}, sending original image: {e}")
+            return image_bytes
     
     def transcribe_image_google_vision(self, image_path: str) -> str:
         """Transcribe image using Google Vision API"""
+        try:
+            return self._transcribe_google_vision(image_path)
+        except Exception as e:
+            print(f"Error transcribing image {image_path}: {e}")
+            return f"Error: {str(e)}"
+    
+    def _transcribe_google_vision(self, image_path: str, image_bytes: Optional[bytes] = None) -> str:
+        """Google Vision transcription that raises on failure instead of returning an error message"""
         if not self.vision_client:
             return "Google Vision API not configured"
         
-        try:
+        if image_bytes is not None:
+            content = image_bytes
+        else:
             with io.open(image_path, 'rb') as image_file:
                 content = image_file.read()
-            
-            image = vision.Image(content=content)
-            response = self.vision_client.text_detection(image=image)
-            texts = response.text_annotations
-            
-            if texts:
-                return texts[0].description
-            else:
-                return "No text detected in image"
         
-        except Exception as e:
-            print(f"Error transcribing image {image_path}: {e}")
-            return f"Error: {str(e)}"
-    
+        image_hash = _content_hash(content)
+        cached_text = self._ocr_cache.get(image_hash)
+        if cached_text is not None:
+            return cached_text
+        
+        image = vision.Image(content=content)
+        response = self._retry(_GOOGLE_VISION_THROTTLE.call, self.vision_client.text_detection, image=image)
+        texts = response.text_annotations
+        
+        transcription = texts[0].description if texts else "No text detected in image"
+        self._ocr_cache.put(image_hash, transcription)
+        return transcription
+
+    def transcribe_images_google_vision_batch(self, image_paths: List[str]) -> List[str]:
+        """Transcribe several images with batched Google Vision requests, in input order"""
+        if not self.vision_client:
+            return ["Google Vision API not configured"] * len(image_paths)
+
+        transcriptions = [""] * len(image_paths)
+        feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+
+        # Group requests so each batch call stays under the per-call image and payload limits
+        batches = []
+        current_batch, current_bytes = [], 0
+        for index, image_path in enumerate(image_paths):
+            try:
+                with io.open(image_path, 'rb') as image_file:
+                    content = image_file.read()
+            except Exception as e:
+                print(f"Error transcribing image {image_path}: {e}")
+                transcriptions[index] = f"Error: {str(e)}"
+                continue
+
+            image_hash = _content_hash(content)
+            cached_text = self._ocr_cache.get(image_hash)
+            if cached_text is not None:
+                transcriptions[index] = cached_text
+                continue
+
+            if current_batch and (len(current_batch) >= VISION_BATCH_MAX_IMAGES or
+                                  current_bytes + len(content) > VISION_BATCH_MAX_BYTES):
+                batches.append(current_batch)
+                current_batch, current_bytes = [], 0
+
+            request = vision.AnnotateImageRequest(image=vision.Image(content=content), features=[feature])
+            current_batch.append((index, image_hash, request))
+            current_bytes += len(content)
+        if current_batch:
+            batches.append(current_batch)
+
+        for batch in batches:
+            try:
+                response = self._retry(
+                    _GOOGLE_VISION_THROTTLE.call,
+                    self.vision_client.batch_annotate_images,
+                    requests=[request for _, _, request in batch],
+                    cost=len(batch)
+                )
+            except Exception as e:
+                print(f"Error transcribing image batch of {len(batch)} images: {e}")
+                for index, _, _ in batch:
+                    transcriptions[index] = f"Error: {str(e)}"
+                continue
+
+            for (index, image_hash, _), image_response in zip(batch, response.responses):
+                if image_response.error.message:
+                    print(f"Error transcribing image {image_paths[index]}: {image_response.error.message}")
+                    transcriptions[index] = f"Error: {image_response.error.message}"
+                    continue
+                if image_response.text_annotations:
+                    transcriptions[index] = image_response.text_annotations[0].description
+                else:
+                    transcriptions[index] = "No text detected in image"
+                self._ocr_cache.put(image_hash, transcriptions[index])
+
+        return transcriptions
+
     def analyze_image_content(self, image_path: str, transcription: str) -> Dict:
         """Analyze image content and extract medical information"""
         try:
@@ -586,68 +1166,37 @@ Note: This analysis was generated using {self.ai_provider.upper()} vision techno
     
     def _get_image_category(self, image_path: str) -> str:
         """Extract image category from file path"""
-        path_parts = Path(image_path).parts
-        
-        # Look for medical imaging categories in path (case-insensitive)
-        medical_keywords = {
-            'ct': 'CT Scan',
-            'mri': 'MRI',
-            'xray': 'X-Ray',
-            'cxr': 'Chest X-Ray',
-            'ultrasound': 'Ultrasound',
-            'echo': 'Echocardiogram',
-            'mammogram': 'Mammogram',
-            'abdomen': 'Abdominal Imaging',
-            'chest': 'Chest Imaging',
-            'head': 'Head Imaging',
-            'brain': 'Brain Imaging',
-            'spine': 'Spine Imaging',
-            'hand': 'Hand Imaging',
-            'foot': 'Foot Imaging',
-            'breast': 'Breast Imaging',
-            'cardiac': 'Cardiac Imaging',
-            'lung': 'Lung Imaging',
-            'liver': 'Liver Imaging',
-            'kidney': 'Kidney Imaging'
-        }
-        
-        # Check each part of the path for medical keywords
-        for part in path_parts:
-            part_lower = part.lower()
-            for keyword, category in medical_keywords.items():
-                if keyword in part_lower:
-                    return category
-        
-        # Try to extract from common folder naming patterns
-        for part in path_parts:
-            part_lower = part.lower()
-            # Look for patterns like "CT_Scans", "MRI_Images", etc.
-            if 'ct' in part_lower and ('scan' in part_lower or 'image' in part_lower):
-                return 'CT Scan'
-            elif 'mri' in part_lower:
-                return 'MRI'
-            elif 'xray' in part_lower or 'x-ray' in part_lower:
-                return 'X-Ray'
-            elif 'ultrasound' in part_lower or 'us' in part_lower:
-                return 'Ultrasound'
-        
-        # If no specific category found, use the parent folder name
-        if len(path_parts) > 1:
-            parent_folder = path_parts[-2]  # Get immediate parent folder
-            return f"Medical Image - {parent_folder}"
-        
-        return 'Medical Image - Uncategorized'
+        return _image_category_for_path(str(image_path))
     
     def enhance_text_with_ai(self, text: str, file_type: str = "document") -> str:
         """Enhance and structure text using AI for better searchability"""
         if self.ai_client is None:
             return text
+        source_text = text[:TEXT_ENHANCEMENT_INPUT_CHARS]
+        
+        # Records sharing the same templated text reuse one enhancement in memory, and across runs only
+        # when the opt-in disk memo is configured (force_reprocess_all clears both through clear_cache)
+        cache_key = _content_hash("\x1f".join([
+            'enhance_text', self.ai_provider, self.model, file_type, source_text
+        ]).encode('utf-8'))
+        cached_text = self._text_enhancement_cache.get(cache_key)
+        if cached_text is not None:
+            return cached_text
+        if self._disk_memo is not None:
+            try:
+                memoized = self._disk_memo.get(cache_key)
+                if memoized is not None:
+                    self._text_enhancement_cache.put(cache_key, memoized['content'])
+                    return memoized['content']
+            except Exception as e:
+                print(f"Warning: Text enhancement memo lookup failed: {e}")
+        
         try:
             prompt = f"""
             Please analyze and enhance this medical {file_type} text for better organization and searchability.
             Extract key medical information, standardize terminology, and create a structured summary.
             
-            Original text: {text[:3000]}  # Limit to avoid token limits
+            Original text: {source_text}  # Limit to avoid token limits
             
             Please format the response with clear sections like:
             - Patient Information
@@ -669,110 +1218,178 @@ Note: This analysis was generated using {self.ai_provider.upper()} vision techno
             )
             
             enhanced_text = ai_response['content']
-            return enhanced_text
         
         except Exception as e:
             print(f"Error enhancing text with AI: {e}")
             return text  # Return original text if enhancement fails
+        
+        # Only successful enhancements are cached so failures are retried on the next call
+        if not isinstance(enhanced_text, str):
+            return enhanced_text
+        self._text_enhancement_cache.put(cache_key, enhanced_text)
+        if self._disk_memo is not None:
+            try:
+                self._disk_memo.put(cache_key, {'content': enhanced_text})
+            except Exception as e:
+                print(f"Warning: Text enhancement memo store failed: {e}")
+        return enhanced_text
     
     def process_file(self, file_path: str) -> List[Dict]:
         """Process any supported file type and return extracted data"""
         file_ext = Path(file_path).suffix.lower()
         
-        if file_ext in ['.xlsx', '.xls']:
-            return self.process_excel_file(file_path)
-        elif file_ext == '.pdf':
-            result = self.process_pdf_file(file_path)
-            return [result] if result['content'] else []
-        elif file_ext == '.docx':
-            result = self.process_docx_file(file_path)
-            return [result] if result['content'] else []
-        elif file_ext == '.txt':
-            result = self.process_text_file(file_path)
-            return [result] if result['content'] else []
-        elif file_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-            transcription = self.transcribe_image_google_vision(file_path)
-            result = self.analyze_image_content(file_path, transcription)
-            return [result] if result else []
-        else:
+        handler = self._ext_dispatch.get(file_ext)
+        if handler is None:
             print(f"Unsupported file type: {file_ext}")
             return []
+        return handler(file_path)
+    
+    def _build_ext_dispatch(self) -> Dict[str, Callable[[str], List[Dict]]]:
+        """Map each supported file extension to a handler returning extracted records"""
+        def single_record(process_fn):
+            def handler(file_path: str) -> List[Dict]:
+                result = process_fn(file_path)
+                return [result] if result['content'] else []
+            return handler
+        
+        dispatch = {
+            '.xlsx': self.process_excel_file,
+            '.xls': self.process_excel_file,
+            '.pdf': single_record(self.process_pdf_file),
+            '.docx': single_record(self.process_docx_file),
+            '.txt': single_record(self.process_text_file),
+        }
+        dispatch.update(dict.fromkeys(IMAGE_EXTENSIONS,
+                                      lambda file_path: self.process_image_files([file_path])))
+        return dispatch
+    
+    def process_files_parallel(self, file_paths: List[str], max_workers: int = 8) -> List[Dict]:
+        """Process many files concurrently and return all extracted records in input order"""
+        # OCR every image up front with batched Vision calls; the per-file work then runs in the pool
+        image_paths = [file_path for file_path in file_paths if Path(file_path).suffix.lower() in IMAGE_EXTENSIONS]
+        transcriptions = dict(zip(image_paths, self.transcribe_images_google_vision_batch(image_paths)))
+        
+        def handle(file_path: str) -> List[Dict]:
+            if file_path in transcriptions:
+                result = self.analyze_image_content(file_path, transcriptions[file_path])
+                return [result] if result else []
+            return self.process_file(file_path)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            per_file_records = list(executor.map(handle, file_paths))
+        return [record for records in per_file_records for record in records]
+
+    def process_image_files(self, file_paths: List[str]) -> List[Dict]:
+        """Process several image files, transcribing them with batched Google Vision calls"""
+        transcriptions = self.transcribe_images_google_vision_batch(file_paths)
+        results = []
+        for file_path, transcription in zip(file_paths, transcriptions):
+            result = self.analyze_image_content(file_path, transcription)
+            if result:
+                results.append(result)
+        return results
     
     def enhance_image_analysis_with_patient_context(self, transcription: str, image_category: str, 
                                                    patient_name: str, patient_id: str, clinical_context: str = "") -> str:
         """Enhance image transcription with known patient context and clinical information"""
         if self.ai_client is None:
-            fallback_transcription = f"PATIENT: {patient_name} (ID: {patient_id})\n"
-            fallback_transcription += f"IMAGE TYPE: {image_category}\n"
-            fallback_transcription += "=" * 50 + "\n\n"
-            fallback_transcription += f"Image transcription: {transcription}\n\n"
-            if clinical_context:
-                fallback_transcription += f"Clinical Context: {clinical_context}\n\n"
-            fallback_transcription += "Note: AI enhancement unavailable with current configuration."
-            return fallback_transcription
+            return self._format_fallback(patient_name, patient_id, image_category, transcription, clinical_context,
+                                         "Note: AI enhancement unavailable with current configuration.")
+        if not transcription or transcription in _EMPTY_TRANSCRIPTIONS:
+            # Nothing was extracted from the image, so an LLM call would only invent findings
+            return self._format_fallback(patient_name, patient_id, image_category, transcription, clinical_context,
+                                         "Note: AI enhancement skipped, no text was extracted from the image.")
         try:
-            prompt = f"""
-            You are analyzing a medical image for a known patient. Provide a comprehensive analysis that combines:
-            1. The image transcription
-            2. The known patient information
-            3. Clinical context from their medical records
+            # Reuse the enhancement for identical patient, transcription, context and category
+            cache_key = _content_hash("\x1f".join([
+                self.ai_provider, self.model, patient_name, patient_id, image_category, transcription, clinical_context
+            ]).encode('utf-8'))
+            cached_transcription = self._enhancement_cache.get(cache_key)
+            if cached_transcription is not None:
+                return cached_transcription
             
-            PATIENT INFORMATION:
-            Name: {patient_name}
-            Patient ID: {patient_id}
-            
-            IMAGE DETAILS:
-            Category: {image_category}
-            Transcription: {transcription}
-            
-            CLINICAL CONTEXT:
-            {clinical_context if clinical_context else "No additional clinical context available"}
-            
-            Please provide a structured analysis including:
-            - Patient identification
-            - Image type and findings
-            - Relevant observations from the transcription
-            - Correlation with clinical context (if available)
-            - Key medical findings or abnormalities noted
-            
-            Format as a clear, structured medical report.
-            """
+            # Only the patient, image and context fields vary; the instructions are module constants
+            prompt = (
+                f"{_ENHANCEMENT_PROMPT_HEAD}"
+                f"Name: {patient_name}\n"
+                f"            Patient ID: {patient_id}\n"
+                f"            \n"
+                f"            IMAGE DETAILS:\n"
+                f"            Category: {image_category}\n"
+                f"            Transcription: {transcription}\n"
+                f"            \n"
+                f"            CLINICAL CONTEXT:\n"
+                f"            {clinical_context if clinical_context else 'No additional clinical context available'}"
+                f"{_ENHANCEMENT_PROMPT_TAIL}"
+            )
             
-            # Generate enhanced analysis using unified AI client
+            # Generate enhanced analysis using unified AI client, sizing the completion budget to the input
             ai_response = self.ai_client.generate_text(
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.1,
-                max_tokens=1500
+                max_tokens=_enhancement_max_tokens(transcription, clinical_context)
             )
             
             enhanced_analysis = ai_response['content']
             
             # Prepend patient info for easy identification
-            final_transcription = f"PATIENT: {patient_name} (ID: {patient_id})\n"
-            final_transcription += f"IMAGE TYPE: {image_category}\n"
-            final_transcription += "=" * 50 + "\n\n"
-            final_transcription += enhanced_analysis
-            final_transcription += "\n\n" + "=" * 50
-            final_transcription += f"\nORIGINAL TRANSCRIPTION: {transcription}"
-            
+            final_transcription = "\n".join([
+                f"PATIENT: {patient_name} (ID: {patient_id})",
+                f"IMAGE TYPE: {image_category}",
+                _SEP,
+                "",
+                enhanced_analysis,
+                "",
+                _SEP,
+                f"ORIGINAL TRANSCRIPTION: {transcription}",
+            ])
+            self._enhancement_cache.put(cache_key, final_transcription)
             return final_transcription
             
         except Exception as e:
             print(f"Error enhancing image analysis with patient context: {e}")
             # Fallback: at least include patient info
-            fallback_transcription = f"PATIENT: {patient_name} (ID: {patient_id})\n"
-            fallback_transcription += f"IMAGE TYPE: {image_category}\n"
-            fallback_transcription += "=" * 50 + "\n\n"
-            fallback_transcription += f"Image transcription: {transcription}\n\n"
-            if clinical_context:
-                fallback_transcription += f"Clinical Context: {clinical_context}\n\n"
-            fallback_transcription += "Note: AI enhancement failed, showing basic transcription with patient context."
-            
-            return fallback_transcription
+            return self._format_fallback(patient_name, patient_id, image_category, transcription, clinical_context,
+                                         "Note: AI enhancement failed, showing basic transcription with patient context.")
+    
+    def _format_fallback(self, patient_name: str, patient_id: str, image_category: str, transcription: str,
+                         clinical_context: str, note: str) -> str:
+        """Build the basic patient-context transcription used when AI enhancement is skipped or fails"""
+        parts = [
+            f"PATIENT: {patient_name} (ID: {patient_id})",
+            f"IMAGE TYPE: {image_category}",
+            _SEP,
+            "",
+            f"Image transcription: {transcription}",
+            "",
+        ]
+        if clinical_context:
+            parts.extend([f"Clinical Context: {clinical_context}", ""])
+        parts.append(note)
+        return "\n".join(parts)
 
     def transcribe_and_analyze_image(self, image_path: str, patient_name: str = "", 
-                                   patient_id: str = "", clinical_context: str = "") -> Dict[str, str]:
+                                   patient_id: str = "", clinical_context: str = "",
+                                   image_bytes: Optional[bytes] = None) -> Dict[str, str]:
         """Comprehensive image analysis using both text extraction and visual analysis"""
+        # Replay a persisted analysis of the same image content, patient and context
+        memo_key = None
+        if self._disk_memo is not None:
+            try:
+                # The category comes from the path and every provider in the chain may answer
+                memo_key = _content_hash("\x1f".join([
+                    _content_hash(image_bytes) if image_bytes is not None else _file_content_hash(image_path),
+                    self._get_image_category(image_path), self._vision_chain_signature(),
+                    str(self.vision_client is not None), patient_name, patient_id, clinical_context
+                ]).encode('utf-8'))
+                memoized = self._disk_memo.get(memo_key)
+                if memoized is not None:
+                    return memoized
+            except Exception as e:
+                print(f"Warning: Image analysis memo lookup failed: {e}")
+                memo_key = None
+        started = time.monotonic()
+        
         result = {
             'patient_name': patient_name,
             'patient_id': patient_id,
@@ -780,27 +1397,42 @@ Note: This analysis was generated using {self.ai_provider.upper()} vision techno
             'text_extraction': '',
             'visual_analysis': '',
             'combined_analysis': '',
-            'processing_method': ''
+            'processing_method': '',
+            'text_ok': False,
+            'visual_ok': False
         }
         
-        # Try Google Vision for text extraction first
-        if self.vision_client:
+        # Google Vision text extraction and AI Vision analysis are independent, so run them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            ocr_future = executor.submit(self._transcribe_google_vision, image_path, image_bytes) if self.vision_client else None
+            vision_future = executor.submit(
+                self._analyze_image_ai_vision, image_path, patient_name, patient_id, clinical_context, image_bytes
+            )
+        
+        # Google Vision text extraction
+        text_failed = False
+        if ocr_future is not None:
             try:
-                result['text_extraction'] = self.transcribe_image_google_vision(image_path)
+                result['text_extraction'] = ocr_future.result()
+                result['text_ok'] = (bool(result['text_extraction'])
+                                     and result['text_extraction'] not in _EMPTY_TRANSCRIPTIONS)
                 result['processing_method'] = f'Google Vision + {self.ai_provider.upper()} Analysis'
             except Exception as e:
+                text_failed = True
                 print(f"Google Vision failed: {e}")
                 result['text_extraction'] = "Text extraction failed"
         else:
             result['text_extraction'] = "Google Vision API not configured"
         
-        # Try AI Vision for comprehensive analysis
+        # AI Vision comprehensive analysis
         try:
-            result['visual_analysis'] = self.analyze_image_with_ai_vision(
-                image_path, patient_name, patient_id, clinical_context
-            )
+            result['visual_analysis'] = vision_future.result()
+            result['visual_ok'] = bool(result['visual_analysis'])
             if result['processing_method'] == '':
                 result['processing_method'] = f'{self.ai_provider.upper()} Vision Analysis Only'
+        except _VisionUnavailable as e:
+            # Not a failure worth logging: the configuration has no vision model, so rely on extracted text
+            result['visual_analysis'] = str(e)
         except Exception as e:
             print(f"AI Vision failed: {e}")
             result['visual_analysis'] = f"Visual analysis failed: {str(e)}"
@@ -808,12 +1440,12 @@ Note: This analysis was generated using {self.ai_provider.upper()} vision techno
                 result['processing_method'] = 'No analysis available'
         
         # Create combined analysis
-        if result['visual_analysis'] and "Error" not in result['visual_analysis']:
+        if result['visual_ok']:
             # Visual analysis is primary
             result['combined_analysis'] = result['visual_analysis']
-            if result['text_extraction'] and result['text_extraction'] not in ["No text detected in image", "Google Vision API not configured", "Text extraction failed"]:
+            if result['text_ok']:
                 result['combined_analysis'] += f"\n\nEXTRACTED TEXT:\n{result['text_extraction']}"
-        elif result['text_extraction'] and result['text_extraction'] not in ["No text detected in image", "Google Vision API not configured", "Text extraction failed"]:
+        elif result['text_ok']:
             # Fallback to text-based analysis
             result['combined_analysis'] = f"Patient: {patient_name} (ID: {patient_id})\nImage Category: {result['image_category']}\n\nExtracted Text Analysis:\n{result['text_extraction']}"
             if result['processing_method'] == '':
@@ -823,4 +1455,12 @@ Note: This analysis was generated using {self.ai_provider.upper()} vision techno
             result['combined_analysis'] = f"Patient: {patient_name} (ID: {patient_id})\nImage Category: {result['image_category']}\nNote: Image analysis not available - please check API configurations"
             result['processing_method'] = 'Basic metadata only'
         
-        return result 
+        # Persist only complete, expensive analyses so failures are retried on the next run
+        if (memo_key is not None and time.monotonic() - started > MEMO_MIN_DURATION
+                and result['visual_ok'] and not text_failed):
+            try:
+                self._disk_memo.put(memo_key, result)
+            except Exception as e:
+                print(f"Warning: Image analysis memo store failed: {e}")
+        
+        return result 
\ No newline at end of file
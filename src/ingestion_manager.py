@@ -1,14 +1,318 @@
+import logging
 import os
+import re
+import threading
 import time
 from pathlib import Path
-from typing import List, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Dict, Any, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import islice
 import streamlit as st
 import pandas as pd
+from openpyxl import load_workbook
 
 from .database_manager import DatabaseManager
 from .document_processor import DocumentProcessor
 
+# Per-row ingestion diagnostics; disabled unless the app configures DEBUG logging
+log = logging.getLogger(__name__)
+
+# Directory listings modified this recently (ns) are not cached, since coarse filesystem
+# timestamps could hide a later change made within the same tick
+SCAN_CACHE_SETTLE_NS = 2_000_000_000
+
+def _scandir_recursive(path: str, dir_cache: Optional[Dict[str, Tuple[int, list]]] = None) -> Iterator[Tuple[str, str]]:
+    """Yield (file path, lowercase extension) for every file below path, reusing dir_cache listings of unchanged directories"""
+    try:
+        dir_mtime = os.stat(path).st_mtime_ns if dir_cache is not None else None
+        cached = dir_cache.get(path) if dir_cache is not None else None
+        if cached is not None and cached[0] == dir_mtime:
+            listing = cached[1]
+        else:
+            # (path, extension) per entry in directory order, with None marking subdirectories
+            listing = []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        listing.append((entry.path, None))
+                    elif entry.is_file(follow_symlinks=False):
+                        _, dot, ext = entry.name.rpartition('.')
+                        listing.append((entry.path, f".{ext.lower()}" if dot else ''))
+            if dir_cache is not None and time.time_ns() - dir_mtime > SCAN_CACHE_SETTLE_NS:
+                dir_cache[path] = (dir_mtime, listing)
+    except OSError as e:
+        print(f"Warning: Could not scan {path}: {e}")
+        return
+    
+    for entry_path, ext in listing:
+        if ext is None:
+            yield from _scandir_recursive(entry_path, dir_cache)
+        else:
+            yield entry_path, ext
+
+def _file_extension(name: str) -> str:
+    """Lowercase extension of a file name, matching os.path.splitext without its tuple allocation"""
+    _, dot, ext = name.lstrip('.').rpartition('.')
+    return f".{ext.lower()}" if dot else ''
+
+# Counter slot per file category in _analyze_folders; other categories use slot 2
+_FOLDER_SUMMARY_SLOTS = {'documents': 0, 'images': 1}
+
+# Folder name hints used to recognise per-patient folders and recover the patient name
+_PATIENT_FOLDER_KEYWORDS = ('episode', 'patient', 'case', 'record')
+_PATIENT_FOLDER_SUFFIX_RE = re.compile(r'_(?:Episode|Patient|Case|Record)')
+_SKIP_PATIENT_FOLDERS = frozenset({'dataset', 'documents', 'images', 'files', 'data', 'medical', 'records', 'reports'})
+_NAME_SEPARATORS = str.maketrans('_-', '  ')
+
+# Environment variable overriding how many dataset rows are ingested concurrently
+INGEST_MAX_WORKERS_ENV = "INGEST_MAX_WORKERS"
+
+# Minimum seconds between Streamlit progress updates (about 20 per second)
+PROGRESS_UPDATE_INTERVAL = 0.05
+
+# Number of buffered document or image records written per bulk insert
+INGEST_BULK_SIZE = 500
+
+# Clinical record fields always written to the document ("Unknown" when the column is absent)
+_CLINICAL_DEMOGRAPHIC_FIELDS = (
+    ('Name', 'Patient'),
+    ('PatientID', 'Patient ID'),
+    ('Age', 'Age'),
+    ('Gender', 'Gender'),
+)
+
+# Clinical record fields written only when the row has a value, in document order
+_CLINICAL_OPTIONAL_FIELDS = (
+    ('TreatmentDate', 'Treatment Date'),
+    ('DoctorName', 'Doctor'),
+    ('Department', 'Department'),
+    ('Diagnosis', 'Diagnosis'),
+    ('Description', 'Description'),
+    ('Procedures', 'Procedures'),
+    ('Medicines', 'Medications'),
+    ('Allergies', 'Allergies'),
+    ('PastMedicalHistory', 'Past Medical History'),
+    ('Assessments', 'Assessments'),
+    ('FollowUpDate', 'Follow-up Date'),
+    ('ImagePath', 'Associated Image'),
+)
+
+# Raw dataset fields read per row while ingesting (patient matching and the image path)
+_ROW_FIELDS = ('PatientID', 'Name', 'ImagePath')
+
+# Clinical record columns copied into the document metadata
+_CLINICAL_METADATA_FIELDS = (
+    ('patient_id', 'PatientID'),
+    ('patient_name', 'Name'),
+    ('age', 'Age'),
+    ('gender', 'Gender'),
+    ('department', 'Department'),
+    ('image_path', 'ImagePath'),
+)
+
+# Dataset columns read from the Excel file; any other columns are never loaded
+_CLINICAL_COLUMNS = frozenset(column for column, _ in _CLINICAL_DEMOGRAPHIC_FIELDS + _CLINICAL_OPTIONAL_FIELDS)
+
+# Dataset rows parsed and ingested per chunk while streaming the Excel file
+EXCEL_CHUNK_ROWS = 1000
+
+# Cell strings pandas.read_excel treats as missing values
+_EXCEL_NA_STRINGS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+# Strings pandas.read_excel parses as whole numbers or floats when the rest of their column is numeric
+_EXCEL_INT_STRING_RE = re.compile(r'\s*[+-]?\d+\s*')
+_EXCEL_FLOAT_STRING_RE = re.compile(r'\s*[+-]?(?:(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|inf|infinity)\s*', re.IGNORECASE)
+
+def _excel_cell_value(value: Any) -> Any:
+    """Normalize a raw openpyxl cell value the way pandas' openpyxl reader does (missing values become NaN)"""
+    if value is None or (isinstance(value, str) and value in _EXCEL_NA_STRINGS):
+        return float('nan')
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _is_blank_excel_row(values: tuple) -> bool:
+    """Whether an openpyxl row has no values at all"""
+    return all(value is None or value == '' for value in values)
+
+def _excel_column_kinds(rows: Iterator[tuple], wanted: Dict[str, int]) -> Dict[str, type]:
+    """The columns pandas.read_excel would infer as int64 or float64, mapped to int or float"""
+    numeric = set(wanted)  # Columns whose values so far are all bools, numbers or numeric strings
+    floating = set()        # ... of which some value is missing or fractional
+    all_bool = set(wanted)
+    blank_rows = 0
+    for values in rows:
+        if _is_blank_excel_row(values):
+            blank_rows += 1
+            continue
+        if blank_rows:
+            # Blank rows before a non-blank one become all-NaN rows
+            floating.update(wanted)
+            blank_rows = 0
+        for name in list(numeric):
+            position = wanted[name]
+            value = _excel_cell_value(values[position]) if position < len(values) else float('nan')
+            if not isinstance(value, bool):
+                all_bool.discard(name)
+            if isinstance(value, float):
+                floating.add(name)
+            elif isinstance(value, str):
+                if _EXCEL_FLOAT_STRING_RE.fullmatch(value) is None:
+                    numeric.discard(name)
+                elif _EXCEL_INT_STRING_RE.fullmatch(value) is None:
+                    floating.add(name)
+            elif not isinstance(value, int):
+                numeric.discard(name)
+    # A bool column stays bool unless it has missing values
+    return {name: float if name in floating else int
+            for name in numeric if name in floating or name not in all_bool}
+
+def _iter_excel_rows(file_path: str, columns: frozenset) -> Iterator[Dict[str, Any]]:
+    """Stream the first worksheet's data rows as {header: value} dicts, restricted to the given columns"""
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()  # Read-only dimensions can be stale; let the row stream decide
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        
+        # Keep the first occurrence of each wanted column
+        wanted = {}
+        for position, name in enumerate(header):
+            if name is not None and str(name) in columns and str(name) not in wanted:
+                wanted[str(name)] = position
+        
+        # pandas infers each column's dtype from all of its values, so a first pass over the sheet finds the
+        # numeric columns (e.g. a PatientID column with a blank cell reads as 12345.0, not 12345)
+        column_kinds = _excel_column_kinds(islice(sheet.iter_rows(values_only=True), 1, None), wanted)
+        
+        # Blank rows are kept as all-NaN rows like pandas does, except trailing ones, which are dropped
+        blank_rows = 0
+        for values in rows:
+            if _is_blank_excel_row(values):
+                blank_rows += 1
+                continue
+            for _ in range(blank_rows):
+                yield {name: float('nan') for name in wanted}
+            blank_rows = 0
+            row = {name: _excel_cell_value(values[position]) if position < len(values) else float('nan')
+                   for name, position in wanted.items()}
+            for name, kind in column_kinds.items():
+                value = row[name]
+                row[name] = kind(value.strip() if isinstance(value, str) else value)
+            yield row
+    finally:
+        workbook.close()
+
+# Dataset image folder keywords and their categories, in priority order when a path has several
+_DATASET_IMAGE_CATEGORIES = {
+    'cxr': 'CXR',
+    'chestct': 'ChestCT',
+    'abdomect': 'AbdomenCT',
+    'abdomenct': 'AbdomenCT',
+    'headct': 'HeadCT',
+    'breastmri': 'BreastMRI',
+    'hand': 'Hand',
+}
+_DATASET_IMAGE_CATEGORY_RE = re.compile('|'.join(_DATASET_IMAGE_CATEGORIES))
+_DATASET_IMAGE_PRIORITY = {keyword: rank for rank, keyword in enumerate(_DATASET_IMAGE_CATEGORIES)}
+
+@lru_cache(maxsize=1024)
+def _dataset_image_category(path_lower: str) -> str:
+    """Map a lowercased image path to its dataset category in one regex pass (memoized per path)"""
+    keywords = _DATASET_IMAGE_CATEGORY_RE.findall(path_lower)
+    if not keywords:
+        return 'Unknown'
+    return _DATASET_IMAGE_CATEGORIES[min(keywords, key=_DATASET_IMAGE_PRIORITY.__getitem__)]
+
+@lru_cache(maxsize=1024)
+def _patient_folder_names(folder_parts: Tuple[str, ...]) -> Tuple[Optional[str], Optional[str]]:
+    """Return (name from a patient keyword folder, first non-generic folder) for a folder (memoized)"""
+    keyword_name = next(filter(None, map(_patient_name_from_keyword_part, folder_parts)), None)
+    
+    # Check if any folder in the path could be a patient identifier
+    fallback_name = None
+    for part in folder_parts:
+        # Skip common folder names
+        if part.lower() not in _SKIP_PATIENT_FOLDERS and len(part) > 2:
+            # This could be a patient folder
+            fallback_name = part.translate(_NAME_SEPARATORS).strip()
+            break
+    return keyword_name, fallback_name
+
+def _patient_name_from_keyword_part(part: str) -> Optional[str]:
+    """Return the patient name encoded in an episode/patient style path part, if any"""
+    part_lower = part.lower()
+    
+    # Look for patterns indicating patient folders
+    if any(keyword in part_lower for keyword in _PATIENT_FOLDER_KEYWORDS):
+        # Extract patient name from episode/patient folder
+        patient_name = _PATIENT_FOLDER_SUFFIX_RE.sub('', part).translate(_NAME_SEPARATORS).strip()
+        if patient_name and len(patient_name) > 2:  # Valid name
+            return patient_name
+    return None
+
+@lru_cache(maxsize=8192)
+def _patient_name_from_path(file_path: str) -> str:
+    """Extract patient name from filename or folder structure (memoized per path)"""
+    filename = os.path.basename(file_path)
+    path_parts = Path(file_path).parts
+    
+    # Folder heuristics are shared by every file in the same folder
+    keyword_name, fallback_name = _patient_folder_names(path_parts[:-1])
+    
+    # Try to extract patient info from various folder naming patterns
+    if keyword_name:
+        return keyword_name
+    if path_parts:
+        keyword_name = _patient_name_from_keyword_part(path_parts[-1])
+        if keyword_name:
+            return keyword_name
+    
+    # Try to extract from filename patterns
+    filename_base = os.path.splitext(filename)[0]
+    
+    # Look for patient name patterns in filename (e.g., "PatientName_date.docx")
+    if '_' in filename_base:
+        first_part = filename_base.partition('_')[0]
+        # If first part looks like a name (contains letters, reasonable length)
+        if len(first_part) > 2 and any(c.isalpha() for c in first_part):
+            potential_name = first_part.replace('-', ' ').strip()
+            return potential_name
+    
+    # Look for space-separated names in filename
+    if ' ' in filename_base:
+        words = filename_base.split(None, 3)
+        # Take first few words that look like names
+        name_words = []
+        for word in words[:3]:  # Maximum 3 words for name
+            if word and len(word) > 1 and any(c.isalpha() for c in word):
+                name_words.append(word)
+            else:
+                break
+        if name_words:
+            return ' '.join(name_words)
+    
+    if fallback_name is not None:
+        return fallback_name
+    
+    # Final fallback: use filename without extension
+    return filename_base.translate(_NAME_SEPARATORS).strip() or 'Unknown Patient'
+
+def _row_patient(row: Dict[str, Any]) -> Tuple[str, str]:
+    """A dataset row's (patient ID, patient name) as text"""
+    return str(row.get('PatientID', '')).strip(), str(row.get('Name', '')).strip()
+
+def _format_clinical_context(clinical_content: str) -> str:
+    """Truncate clinical record content into the context passed to image analysis"""
+    return f"Clinical History: {clinical_content[:800]}..."
+
 class IngestionManager:
     def __init__(self, database_manager: DatabaseManager, document_processor: DocumentProcessor):
         self.db = database_manager
@@ -20,6 +324,10 @@ class IngestionManager:
         self.images_base_path = self.dataset_path / "images"  # Fixed: should include 'images' directory
         self.excel_file_path = self.documents_path / "clinical_data.xlsx"
         
+        # String form of dataset_path so scanned paths are made relative by slicing instead of pathlib
+        self._dataset_path_str = os.fspath(self.dataset_path)
+        self._dataset_prefix = self._dataset_path_str + os.sep
+        
         # Create directories if they don't exist
         self.dataset_path.mkdir(exist_ok=True)
         self.documents_path.mkdir(exist_ok=True)
@@ -30,6 +338,29 @@ class IngestionManager:
             'documents': ['.xlsx', '.xls', '.docx', '.txt', '.pdf'],
             'images': ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
         }
+        # Extensions picked up by the dataset folder scan
+        self._doc_exts = frozenset({'.pdf', '.docx'})
+        
+        # ImagePath prefixes stripped because images_base_path already includes the images directory
+        self._img_prefixes = ('images\\', 'images/')
+        
+        # Clinical context lookups for standalone images, cleared at the start of each image ingestion
+        self._get_clinical_context = lru_cache(maxsize=256)(self._load_clinical_context)
+        
+        # Serializes SQLite writes from concurrently ingested rows
+        self._db_write_lock = threading.Lock()
+        
+        # Document and image records buffered for bulk inserts during a dataset run (None outside a run)
+        self._pending_writes = None
+        
+        # File names in the documents directory, reused until the directory changes
+        self._docs_dir_cache = None
+        
+        # Per-directory listings of the dataset tree (path -> (mtime, entries)), reused while unchanged
+        self._scan_dir_cache = {}
+        
+        # Image files under images_base_path, listed once per dataset run (None outside a run)
+        self._dataset_image_paths = None
     
     def scan_dataset_folder(self) -> Dict[str, List[str]]:
         """Scan the dataset folder and return categorized file paths"""
@@ -50,32 +381,64 @@ class IngestionManager:
             files['documents'].append(str(self.excel_file_path))
             print(f"Found main dataset file: {self.excel_file_path.relative_to(self.dataset_path)}")
         
-        # Check for PDF files
-        for file_path in self.dataset_path.rglob("*.pdf"):
-            if file_path.is_file():
-                files['documents'].append(str(file_path))
-                print(f"Found PDF file: {file_path.relative_to(self.dataset_path)}")
-
-        # Check for DOCX files
-        for file_path in self.dataset_path.rglob("*.docx"):
-            if file_path.is_file():
-                files['documents'].append(str(file_path))
-                print(f"Found DOCX file: {file_path.relative_to(self.dataset_path)}")
-
-        # Count images for informational purposes (already handled by ImagePath column in Excel)
-        images_dir = self.dataset_path / "images"
-        image_count = 0
-        if images_dir.exists():
-            for file_path in images_dir.rglob("*"):
-                if file_path.is_file():
-                    ext = file_path.suffix.lower()
-                    if ext in self.supported_extensions['images']:
-                        image_count += 1
-
-        print(f"Found {image_count} images in the dataset")
+        # Walk the tree once, collecting PDF and DOCX files
+        # (images are handled by the ImagePath column in Excel)
+        found_documents = {'.pdf': [], '.docx': []}
+        for file_path, ext in _scandir_recursive(self._dataset_path_str, self._scan_dir_cache):
+            if ext in self._doc_exts:
+                found_documents[ext].append(file_path)
+        
+        for ext, label in (('.pdf', 'PDF'), ('.docx', 'DOCX')):
+            for file_path in found_documents[ext]:
+                files['documents'].append(file_path)
+                print(f"Found {label} file: {self._dataset_relative_path(file_path)}")
 
         return files
     
+    def _dataset_relative_path(self, file_path: str) -> str:
+        """Return a scanned file path relative to the dataset folder"""
+        if file_path.startswith(self._dataset_prefix):
+            return file_path[len(self._dataset_prefix):]
+        return os.path.relpath(file_path, self._dataset_path_str)
+    
+    def _dataset_relative_folder(self, file_path: str) -> str:
+        """Return the folder of a scanned file relative to the dataset folder ('.' for the root)"""
+        return self._dataset_relative_path(file_path).rpartition(os.sep)[0] or '.'
+    
+    def _list_documents_dir(self) -> List[Tuple[str, str, int, str]]:
+        """List (name, path, size, suffix) for files in the documents directory; names are cached by directory mtime"""
+        documents_dir = str(self.dataset_path / "documents")
+        try:
+            dir_mtime = os.stat(documents_dir).st_mtime_ns
+        except OSError:
+            return []
+        if self._docs_dir_cache is not None and self._docs_dir_cache[0] == dir_mtime:
+            names = self._docs_dir_cache[1]
+        else:
+            names = []
+            with os.scandir(documents_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        names.append((entry.name, entry.path, _file_extension(entry.name)))
+            if time.time_ns() - dir_mtime > SCAN_CACHE_SETTLE_NS:
+                self._docs_dir_cache = (dir_mtime, names)
+        
+        # Editing a file in place keeps the directory mtime, so sizes are always read fresh
+        listing = []
+        for name, file_path, ext in names:
+            try:
+                listing.append((name, file_path, os.stat(file_path).st_size, ext))
+            except OSError:
+                continue
+        return listing
+    
+    def _candidate_document_paths(self, documents_listing: List[Tuple[str, str, int, str]]) -> List[str]:
+        """Paths of the Excel dataset plus DOCX and PDF files that may need processing"""
+        candidate_paths = [str(self.excel_file_path)] if self.excel_file_path.exists() else []
+        for suffix in ('.docx', '.pdf'):
+            candidate_paths.extend(file_path for _, file_path, _, ext in documents_listing if ext == suffix)
+        return candidate_paths
+    
     def get_files_to_process(self) -> Dict[str, List[str]]:
         """Get files that need to be processed (new or modified)"""
         all_files = self.scan_dataset_folder()
@@ -86,31 +449,20 @@ class IngestionManager:
             'unknown': []
         }
         
+        # Look up the processing status of every candidate file in one query
+        documents_listing = self._list_documents_dir()
+        processed = self.db.get_processed_set(self._candidate_document_paths(documents_listing))
+        
         # Check if the main Excel file needs processing
-        if self.excel_file_path.exists() and not self.db.is_file_processed(str(self.excel_file_path)):
+        if self.excel_file_path.exists() and str(self.excel_file_path) not in processed:
             files_to_process['documents'].append(str(self.excel_file_path))
         
-        # Check for additional document files (DOCX) in the documents directory that might have been added
-        documents_dir = self.dataset_path / "documents"
-        if documents_dir.exists():
-            for file_path in documents_dir.glob("*.docx"):
-                if file_path.is_file() and file_path != self.excel_file_path:
-                    ext = file_path.suffix.lower()
-                    if ext in self.supported_extensions['documents']:
-                        if not self.db.is_file_processed(str(file_path)):
-                            files_to_process['documents'].append(str(file_path))
-                            print(f"📄 Found new/modified document: {file_path.name}")
-
-        # Check for additional PDF files in the PDFs directory that might have been added
-        pdfs_dir = self.dataset_path / "documents"
-        if pdfs_dir.exists():
-            for file_path in pdfs_dir.glob("*.pdf"):
-                if file_path.is_file():
-                    ext = file_path.suffix.lower()
-                    if ext in self.supported_extensions['documents']:
-                        if not self.db.is_file_processed(str(file_path)):
-                            files_to_process['documents'].append(str(file_path))
-                            print(f"📄 Found new/modified PDF: {file_path.name}")
+        # Check for additional DOCX and PDF files in the documents directory that might have been added
+        for suffix, label in (('.docx', 'document'), ('.pdf', 'PDF')):
+            for name, file_path, _, ext in documents_listing:
+                if ext == suffix and file_path not in processed:
+                    files_to_process['documents'].append(file_path)
+                    print(f"📄 Found new/modified {label}: {name}")
         
         # Note: Images are processed as part of the Excel dataset processing via ImagePath column
         # We don't process standalone images that aren't referenced in the dataset
@@ -133,87 +485,62 @@ class IngestionManager:
         try:
             print(f"📊 Processing main dataset: {file_path}")
             
-            # Read the Excel file
-            df = pd.read_excel(file_path)
-            print(f"Dataset shape: {df.shape}")
-            print(f"Columns: {list(df.columns)}")
+            # Skip the whole dataset when its bytes match the last ingested version
+            content_hash = self.db.calculate_file_hash(file_path)
+            cache_hit = self._unchanged_since_last_run(file_path, content_hash)
+            if cache_hit:
+                return {**cache_hit, 'patients_processed': 0, 'images_processed': 0, 'errors': []}
             
             processed_count = 0
             image_processed_count = 0
+            image_reference_count = 0
             errors = []
             
-            for index, row in df.iterrows():
-                try:
-                    # Extract patient information
-                    patient_id = str(row.get('PatientID', '')).strip()
-                    patient_name = str(row.get('Name', '')).strip()
-                    
-                    if not patient_name or patient_name == 'nan':
-                        print(f"Skipping row {index}: No patient name found")
-                        continue
-                    
-                    # Find or create patient
-                    patient_uuid = self.db.find_or_create_patient(patient_name, patient_id)
-                    
-                    # Prepare clinical data content
-                    clinical_data = self._prepare_clinical_content(row)
-                    
-                    # Add clinical document to database
-                    # Use a virtual file path that includes the row index
-                    virtual_file_path = f"{file_path}#row_{index}"
-                    
-                    self.db.add_document(
-                        patient_uuid=patient_uuid,
-                        file_path=virtual_file_path,
-                        content=clinical_data['content'],
-                        processed_content=clinical_data['processed_content'],
-                        metadata=clinical_data['metadata']
-                    )
-                    processed_count += 1
-                    
-                    # Process associated image if available
-                    image_path = row.get('ImagePath', '').strip()
-                    if image_path and image_path != 'nan':
-                        # Remove 'images\' or 'images/' prefix if it exists since images_base_path already includes it
-                        clean_image_path = image_path
-                        if clean_image_path.startswith('images\\') or clean_image_path.startswith('images/'):
-                            clean_image_path = clean_image_path[7:]  # Remove 'images\' or 'images/' prefix (7 characters)
-                        
-                        # Convert relative path to absolute path
-                        full_image_path = self.images_base_path / clean_image_path.replace('\\', os.sep)
-                        
-                        if full_image_path.exists():
-                            print(f"   Processing image: {image_path}")
-                            image_result = self._process_patient_image(
-                                str(full_image_path), 
-                                patient_uuid, 
-                                patient_name, 
-                                patient_id
-                            )
-                            if image_result['status'] == 'success':
-                                image_processed_count += 1
-                                print(f"   ✅ Image processed for {patient_name}")
-                            else:
-                                print(f"   ❌ Image processing failed for {patient_name}: {image_result['message']}")
-                        else:
-                            print(f"   ⚠️ Image not found for {patient_name}: {full_image_path}")
-                            print(f"       Expected path: {full_image_path}")
-                            print(f"       Raw image path from Excel: {image_path}")
-                            print(f"       Cleaned image path: {clean_image_path}")
-                            print(f"       Images base path: {self.images_base_path}")
-                    
-                    # Show progress every 25 records
-                    if (index + 1) % 25 == 0:
-                        print(f"✅ Processed {index + 1}/{len(df)} patients... ({processed_count} patients, {image_processed_count} images)")
+            # List the images directory once so rows check image existence without a stat() each
+            self._dataset_image_paths = {
+                os.path.normcase(image_path)
+                for image_path, _ in _scandir_recursive(str(self.images_base_path), self._scan_dir_cache)
+            }
+            
+            # Buffer row inserts so they are written in bulk transactions
+            self._pending_writes = {'documents': [], 'images': []}
+            
+            # Stream the worksheet (only the columns the clinical records use) and ingest it chunk by chunk,
+            # so memory stays bounded by the chunk size rather than the dataset size
+            max_workers = self._ingest_max_workers()
+            row_count = 0
+            progress = {'rows': 0, 'patients': 0, 'images': 0}
+            excel_rows = _iter_excel_rows(file_path, _CLINICAL_COLUMNS)
+            while True:
+                chunk = list(islice(excel_rows, EXCEL_CHUNK_ROWS))
+                if not chunk:
+                    break
+                df = pd.DataFrame(chunk, index=range(row_count, row_count + len(chunk)), dtype=object)
+                if row_count == 0:
+                    print(f"Columns: {list(df.columns)}")
+                row_count += len(chunk)
+                if 'ImagePath' in df.columns:
+                    image_reference_count += int(df['ImagePath'].notna().sum())
                 
-                except Exception as e:
-                    error_msg = f"Error processing row {index} (Patient: {row.get('Name', 'Unknown')}): {str(e)}"
-                    errors.append(error_msg)
-                    print(f"❌ {error_msg}")
-                    continue
+                outcomes = self._ingest_rows(file_path, df, max_workers, progress)
+                
+                # Tally the outcomes in row order
+                for index in df.index:
+                    outcome = outcomes[index]
+                    processed_count += outcome['document']
+                    image_processed_count += outcome['image']
+                    if outcome['error']:
+                        errors.append(outcome['error'])
+                
+                # Write the chunk's buffered records once all of its rows are done, so they go in in row order
+                with self._db_write_lock:
+                    self._flush_pending_writes()
+            
+            print(f"Dataset rows: {row_count}")
+            print(f"Found {image_reference_count} image references in the dataset")
             
             # Mark the main Excel file as processed (not the individual rows)
-            self.db.mark_file_processed(file_path)
+            self.db.mark_file_processed(file_path, content_hash)
             
             return {
                 'status': 'success',
@@ -232,101 +559,271 @@ class IngestionManager:
                 'images_processed': 0,
                 'message': f"Error processing dataset: {str(e)}"
             }
+        finally:
+            self._dataset_image_paths = None
+            self._pending_writes = None
     
-    def _prepare_clinical_content(self, row: pd.Series) -> Dict[str, str]:
-        """Prepare clinical content from a row of data"""
-        # Build structured clinical content
-        content_parts = []
-        
-        # Patient demographics
-        content_parts.append(f"Patient: {row.get('Name', 'Unknown')}")
-        content_parts.append(f"Patient ID: {row.get('PatientID', 'Unknown')}")
-        content_parts.append(f"Age: {row.get('Age', 'Unknown')}")
-        content_parts.append(f"Gender: {row.get('Gender', 'Unknown')}")
-        
-        # Clinical information
-        if pd.notna(row.get('TreatmentDate')):
-            content_parts.append(f"Treatment Date: {row.get('TreatmentDate')}")
-        
-        if pd.notna(row.get('DoctorName')):
-            content_parts.append(f"Doctor: {row.get('DoctorName')}")
-            
-        if pd.notna(row.get('Department')):
-            content_parts.append(f"Department: {row.get('Department')}")
-        
-        # Medical details
-        if pd.notna(row.get('Diagnosis')):
-            content_parts.append(f"Diagnosis: {row.get('Diagnosis')}")
-            
-        if pd.notna(row.get('Description')):
-            content_parts.append(f"Description: {row.get('Description')}")
-            
-        if pd.notna(row.get('Procedures')):
-            content_parts.append(f"Procedures: {row.get('Procedures')}")
+    def _ingest_rows(self, file_path: str, df: pd.DataFrame, max_workers: int,
+                     progress: Dict[str, int]) -> Dict[Any, Dict[str, Any]]:
+        """Ingest a chunk of dataset rows, returning each row's outcome keyed by its index"""
+        # Build every row's clinical content and metadata column-wise up front
+        clinical_batch = self._prepare_clinical_content_batch(df)
+        # Rows only need a few raw fields, so iterate light tuples of just those columns
+        row_fields = [column for column in _ROW_FIELDS if column in df.columns]
+        row_values = df[row_fields].itertuples(index=False, name=None) if row_fields else [()] * len(df)
+        row_dicts = (dict(zip(row_fields, values)) for values in row_values)
+        rows = list(zip(df.index, row_dicts, clinical_batch['content'], clinical_batch['metadata']))
+        
+        # Match patients in row order as sequential ingestion does, so fuzzy matches and patient ids
+        # don't depend on which rows finish first (a row whose lookup fails retries it and reports the error)
+        patient_uuids = {}
+        with self._db_write_lock:
+            for index, row, _, _ in rows:
+                patient_id, patient_name = _row_patient(row)
+                if patient_name and patient_name != 'nan':
+                    try:
+                        patient_uuids[index] = self.db.find_or_create_patient(patient_name, patient_id)
+                    except Exception:
+                        pass
+        
+        # Rows are independent and I/O-bound (AI calls and SQLite), so ingest them concurrently
+        outcomes = {}
+        def finish(index, outcome):
+            outcomes[index] = outcome
+            progress['rows'] += 1
+            progress['patients'] += outcome['document']
+            progress['images'] += outcome['image']
+            # Show progress every 25 records
+            if progress['rows'] % 25 == 0:
+                print(f"✅ Processed {progress['rows']} rows... "
+                      f"({progress['patients']} patients, {progress['images']} images)")
+        
+        if max_workers <= 1:
+            # Read the next row's image while the current row waits on the AI APIs
+            with ThreadPoolExecutor(max_workers=1) as prefetcher:
+                next_read = self._prefetch_row_image(prefetcher, rows[0][1]) if rows else None
+                for position, (index, row, content, metadata) in enumerate(rows):
+                    image_read = next_read
+                    if position + 1 < len(rows):
+                        next_read = self._prefetch_row_image(prefetcher, rows[position + 1][1])
+                    finish(index, self._ingest_one_row(file_path, index, row, content, metadata,
+                                                       patient_uuids.get(index), image_read))
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_index = {
+                    executor.submit(self._ingest_one_row, file_path, index, row, content, metadata,
+                                    patient_uuids.get(index)): index
+                    for index, row, content, metadata in rows
+                }
+                for future in as_completed(future_to_index):
+                    finish(future_to_index[future], future.result())
+        return outcomes
+    
+    def _write_record(self, table: str, record: Dict[str, Any], row_index: int = 0):
+        """Add a document or image record, buffering it with its dataset row index during a dataset run"""
+        # Callers hold self._db_write_lock
+        if self._pending_writes is None:
+            (self.db.add_document if table == 'documents' else self.db.add_image)(**record)
+            return
+        self._pending_writes[table].append((row_index, record))
+    
+    def _flush_pending_writes(self):
+        """Bulk-insert buffered records in row order, falling back to one insert per record if a batch fails"""
+        for name in ['documents', 'images']:
+            buffered, self._pending_writes[name] = self._pending_writes[name], []
+            # Rows finish in any order; inserting in row order makes the last row win when several rows
+            # upsert the same image, as it does when rows are ingested one by one
+            records = [record for _, record in sorted(buffered, key=lambda item: item[0])]
+            for start in range(0, len(records), INGEST_BULK_SIZE):
+                batch = records[start:start + INGEST_BULK_SIZE]
+                try:
+                    (self.db.add_documents_bulk if name == 'documents' else self.db.add_images_bulk)(batch)
+                except Exception as e:
+                    print(f"⚠️ Bulk insert of {len(batch)} {name} failed, inserting individually: {e}")
+                    for record in batch:
+                        try:
+                            (self.db.add_document if name == 'documents' else self.db.add_image)(**record)
+                        except Exception as record_error:
+                            print(f"❌ Error adding {record['file_path']}: {record_error}")
+    
+    def _ingest_max_workers(self) -> int:
+        """Number of dataset rows to ingest concurrently"""
+        try:
+            return int(os.getenv(INGEST_MAX_WORKERS_ENV, ''))
+        except ValueError:
+            return min(16, (os.cpu_count() or 1) + 4)
+    
+    def _resolve_dataset_image_path(self, image_path: str) -> Tuple[str, Path]:
+        """Map an Excel ImagePath value to its cleaned relative path and full path under images_base_path"""
+        # Remove 'images\' or 'images/' prefix if it exists since images_base_path already includes it
+        clean_image_path = image_path
+        if clean_image_path.startswith(self._img_prefixes):
+            clean_image_path = clean_image_path[7:]  # Remove 'images\' or 'images/' prefix (7 characters)
+        
+        # Convert relative path to absolute path (only paths with Windows separators need rewriting)
+        native_image_path = clean_image_path
+        if os.sep != '\\' and '\\' in native_image_path:
+            native_image_path = native_image_path.replace('\\', os.sep)
+        return clean_image_path, self.images_base_path / native_image_path
+    
+    def _dataset_image_exists(self, full_image_path: Path) -> bool:
+        """Check an image path against the listing taken at the start of the run, falling back to stat()"""
+        if self._dataset_image_paths is None:
+            return full_image_path.exists()
+        return os.path.normcase(str(full_image_path)) in self._dataset_image_paths
+    
+    def _prefetch_row_image(self, prefetcher: ThreadPoolExecutor, row: Dict[str, Any]) -> Optional[Future]:
+        """Start reading a row's image bytes in the background, if the row has an existing image"""
+        image_path = row.get('ImagePath')
+        if not isinstance(image_path, str) or not image_path.strip() or image_path.strip() == 'nan':
+            return None
+        full_image_path = self._resolve_dataset_image_path(image_path.strip())[1]
+        return prefetcher.submit(full_image_path.read_bytes) if self._dataset_image_exists(full_image_path) else None
+    
+    def _prefetched_bytes(self, image_read: Optional[Future]) -> Optional[bytes]:
+        """Bytes from a prefetch read, or None so the image is read from disk as usual"""
+        if image_read is None:
+            return None
+        try:
+            return image_read.result()
+        except OSError as e:
+            print(f"   ⚠️ Image prefetch failed, reading from disk: {e}")
+            return None
+    
+    def _ingest_one_row(self, file_path: str, index: Any, row: Dict[str, Any],
+                        content: str, metadata: Dict[str, str], patient_uuid: Optional[int] = None,
+                        image_read: Optional[Future] = None) -> Dict[str, Any]:
+        """Ingest one dataset row: the patient, the clinical document and any associated image"""
+        outcome = {'document': False, 'image': False, 'error': None}
+        try:
+            # Extract patient information
+            patient_id, patient_name = _row_patient(row)
             
-        if pd.notna(row.get('Medicines')):
-            content_parts.append(f"Medications: {row.get('Medicines')}")
+            if not patient_name or patient_name == 'nan':
+                print(f"Skipping row {index}: No patient name found")
+                return outcome
             
-        if pd.notna(row.get('Allergies')):
-            content_parts.append(f"Allergies: {row.get('Allergies')}")
+            # Enhanced content for better searchability
+            processed_content = self.processor.enhance_text_with_ai(content, "clinical_record")
             
-        if pd.notna(row.get('PastMedicalHistory')):
-            content_parts.append(f"Past Medical History: {row.get('PastMedicalHistory')}")
+            # Add clinical document to database
+            # Use a virtual file path that includes the row index
+            virtual_file_path = f"{file_path}#row_{index}"
             
-        if pd.notna(row.get('Assessments')):
-            content_parts.append(f"Assessments: {row.get('Assessments')}")
+            # Patient matching and inserts are serialized so concurrent rows can't create duplicates
+            with self._db_write_lock:
+                # Find or create patient, unless it was already matched for this row
+                if patient_uuid is None:
+                    patient_uuid = self.db.find_or_create_patient(patient_name, patient_id)
+                
+                self._write_record('documents', dict(
+                    patient_uuid=patient_uuid,
+                    file_path=virtual_file_path,
+                    content=content,
+                    processed_content=processed_content,
+                    metadata=metadata
+                ), index)
+            outcome['document'] = True
             
-        if pd.notna(row.get('FollowUpDate')):
-            content_parts.append(f"Follow-up Date: {row.get('FollowUpDate')}")
-        
-        # Image reference
-        if pd.notna(row.get('ImagePath')):
-            content_parts.append(f"Associated Image: {row.get('ImagePath')}")
-        
-        content = "\n".join(content_parts)
+            # Process associated image if available
+            image_path = row.get('ImagePath', '').strip()
+            if image_path and image_path != 'nan':
+                clean_image_path, full_image_path = self._resolve_dataset_image_path(image_path)
+                
+                if self._dataset_image_exists(full_image_path):
+                    log.debug("Processing image: %s", image_path)
+                    image_result = self._process_patient_image(
+                        str(full_image_path), 
+                        patient_uuid, 
+                        patient_name, 
+                        patient_id,
+                        clinical_context=_format_clinical_context(content),
+                        image_bytes=self._prefetched_bytes(image_read),
+                        row_index=index
+                    )
+                    if image_result['status'] == 'success':
+                        outcome['image'] = True
+                        log.debug("Image processed for %s", patient_name)
+                    else:
+                        print(f"   ❌ Image processing failed for {patient_name}: {image_result['message']}")
+                else:
+                    print(f"   ⚠️ Image not found for {patient_name}: {full_image_path}")
+                    log.debug("Expected path: %s, raw image path from Excel: %s, cleaned image path: %s, "
+                              "images base path: %s", full_image_path, image_path, clean_image_path,
+                              self.images_base_path)
+    
+        except Exception as e:
+            error_msg = f"Error processing row {index} (Patient: {row.get('Name', 'Unknown')}): {str(e)}"
+            outcome['error'] = error_msg
+            print(f"❌ {error_msg}")
         
-        # Enhanced content for better searchability
-        processed_content = self.processor.enhance_text_with_ai(content, "clinical_record")
+        return outcome
+    
+    def _prepare_clinical_content_batch(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Prepare clinical content and metadata for every row of the dataset, column-wise"""
+        # One "Label: value" column per field; optional fields are blank where the row has no value
+        parts = []
+        for column, label in _CLINICAL_DEMOGRAPHIC_FIELDS:
+            if column in df.columns:
+                parts.append(f"{label}: " + df[column].map(str))
+            else:
+                parts.append(pd.Series(f"{label}: Unknown", index=df.index))
+        for column, label in _CLINICAL_OPTIONAL_FIELDS:
+            if column in df.columns:
+                values = df[column]
+                parts.append((f"{label}: " + values.map(str)).where(values.notna(), ""))
+        
+        content = pd.Series(
+            ["\n".join(part for part in row_parts if part)
+             for row_parts in pd.concat(parts, axis=1).itertuples(index=False, name=None)],
+            index=df.index, dtype=object
+        )
         
         # Metadata
-        metadata = {
-            'file_type': 'clinical_record',
-            'patient_id': str(row.get('PatientID', '')),
-            'patient_name': str(row.get('Name', '')),
-            'age': str(row.get('Age', '')),
-            'gender': str(row.get('Gender', '')),
-            'department': str(row.get('Department', '')),
-            'image_path': str(row.get('ImagePath', ''))
+        metadata_columns = {
+            key: df[column].map(str) if column in df.columns else pd.Series('', index=df.index)
+            for key, column in _CLINICAL_METADATA_FIELDS
         }
+        metadata = pd.Series(
+            [{'file_type': 'clinical_record', **dict(zip(metadata_columns, values))}
+             for values in zip(*metadata_columns.values())],
+            index=df.index, dtype=object
+        )
         
         return {
             'content': content,
-            'processed_content': processed_content,
             'metadata': metadata
         }
     
+    def _load_clinical_context(self, patient_name: str, patient_id: str) -> str:
+        """Build image analysis context from the patient's most recent stored clinical document"""
+        patient_data = self.db.get_patient_data(patient_name=patient_name, patient_id=patient_id)
+        if patient_data and patient_data.get('documents'):
+            # Extract key clinical information for context
+            clinical_doc = patient_data['documents'][0]  # Use the first (most recent) document
+            return _format_clinical_context(clinical_doc.get('content', ''))
+        return ""
+    
     def _process_patient_image(self, image_path: str, patient_uuid: int, 
-                              patient_name: str, patient_id: str) -> Dict[str, Any]:
+                              patient_name: str, patient_id: str,
+                              clinical_context: Optional[str] = None,
+                              image_bytes: Optional[bytes] = None,
+                              row_index: int = 0) -> Dict[str, Any]:
         """Process an image associated with a patient using comprehensive analysis"""
         try:
-            print(f"   🔍 Analyzing image: {os.path.basename(image_path)}")
-            
-            # Get patient clinical data to provide context for image analysis
-            patient_data = self.db.get_patient_data(patient_name=patient_name, patient_id=patient_id)
-            clinical_context = ""
-            if patient_data and patient_data.get('documents'):
-                # Extract key clinical information for context
-                clinical_doc = patient_data['documents'][0]  # Use the first (most recent) document
-                clinical_content = clinical_doc.get('content', '')
-                # Extract key info for image analysis context
-                clinical_context = f"Clinical History: {clinical_content[:800]}..."
+            log.debug("Analyzing image: %s", image_path)
+            
+            # Get patient clinical data to provide context for image analysis unless the caller has it
+            if clinical_context is None:
+                clinical_context = self._get_clinical_context(patient_name, patient_id)
             
             # Use comprehensive image analysis (tries both Google Vision and OpenAI Vision)
             analysis_result = self.processor.transcribe_and_analyze_image(
                 image_path=image_path,
                 patient_name=patient_name,
                 patient_id=patient_id,
-                clinical_context=clinical_context
+                clinical_context=clinical_context,
+                image_bytes=image_bytes
             )
             
             # Use the combined analysis as the main transcription
@@ -334,23 +831,26 @@ class IngestionManager:
             image_category = analysis_result['image_category']
             processing_method = analysis_result['processing_method']
             
-            print(f"   ✅ Image processed using: {processing_method}")
+            log.debug("Image %s processed using: %s", image_path, processing_method)
             
             # Add to database
-            self.db.add_image(
-                patient_uuid=patient_uuid,
-                file_path=image_path,
-                transcription=final_transcription,
-                image_category=image_category,
-                metadata={
-                    'patient_name': patient_name,
-                    'patient_id': patient_id,
-                    'processing_method': processing_method,
-                    'text_extraction': analysis_result['text_extraction'],
-                    'visual_analysis': analysis_result['visual_analysis'],
-                    'processing_status': 'success' if 'Error' not in final_transcription else 'partial_success'
-                }
-            )
+            with self._db_write_lock:
+                self._write_record('images', dict(
+                    patient_uuid=patient_uuid,
+                    file_path=image_path,
+                    transcription=final_transcription,
+                    image_category=image_category,
+                    metadata={
+                        'patient_name': patient_name,
+                        'patient_id': patient_id,
+                        'processing_method': processing_method,
+                        'text_extraction': analysis_result['text_extraction'],
+                        'visual_analysis': analysis_result['visual_analysis'],
+                        'processing_status': 'success' if (
+                            analysis_result.get('visual_ok') or analysis_result.get('text_ok')
+                        ) else 'partial_success'
+                    }
+                ), row_index)
             
             return {
                 'status': 'success',
@@ -366,22 +866,7 @@ class IngestionManager:
     
     def _get_image_category_from_path(self, image_path: str) -> str:
         """Determine image category from the file path"""
-        path_lower = image_path.lower()
-        
-        if 'cxr' in path_lower:
-            return 'CXR'
-        elif 'chestct' in path_lower:
-            return 'ChestCT'
-        elif 'abdomect' in path_lower or 'abdomenct' in path_lower:
-            return 'AbdomenCT'
-        elif 'headct' in path_lower:
-            return 'HeadCT'
-        elif 'breastmri' in path_lower:
-            return 'BreastMRI'
-        elif 'hand' in path_lower:
-            return 'Hand'
-        else:
-            return 'Unknown'
+        return _dataset_image_category(image_path.lower())
     
     def process_single_document(self, file_path: str) -> Dict[str, Any]:
         """Process a single document file - now handles the main Excel dataset"""
@@ -392,9 +877,29 @@ class IngestionManager:
             # Fallback for other document types (if any)
             return self._process_legacy_document(file_path)
 
+    def _unchanged_since_last_run(self, file_path: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return a cache-hit result if the file's content hash matches its last processed hash"""
+        if not content_hash or self.db.get_last_content_hash(file_path) != content_hash:
+            return None
+        
+        # Only the modification time changed; refresh it so the file no longer shows as pending
+        self.db.mark_file_processed(file_path, content_hash)
+        print(f"⏭️ Skipping {os.path.basename(file_path)}: content unchanged since last ingestion")
+        return {
+            'status': 'success',
+            'file_path': file_path,
+            'cache_hit': True,
+            'message': f"{os.path.basename(file_path)} is unchanged since the last ingestion"
+        }
+    
     def _process_legacy_document(self, file_path: str) -> Dict[str, Any]:
         """Fallback method for processing individual document files (legacy support)"""
         try:
+            content_hash = self.db.calculate_file_hash(file_path)
+            cache_hit = self._unchanged_since_last_run(file_path, content_hash)
+            if cache_hit:
+                return {**cache_hit, 'records_processed': 0}
+            
             results = self.processor.process_file(file_path)
             processed_count = 0
             
@@ -476,6 +981,19 @@ class IngestionManager:
                 'message': f"Error processing image {os.path.basename(file_path)}: {str(e)}"
             }
 
+    def _start_progress(self) -> Dict[str, Any]:
+        """Create the Streamlit progress bar and status text for an ingestion loop"""
+        return {'progress_bar': st.progress(0), 'status_text': st.empty(), 'last_ts': 0.0}
+    
+    def _maybe_update_progress(self, i: int, total: int, name: str, progress: Dict[str, Any]):
+        """Update the progress widgets, throttled to one update per interval except for the last item"""
+        now = time.monotonic()
+        if i + 1 < total and now - progress['last_ts'] < PROGRESS_UPDATE_INTERVAL:
+            return
+        progress['last_ts'] = now
+        progress['progress_bar'].progress((i + 1) / total)
+        progress['status_text'].text(f"Processing {name}...")
+    
     def ingest_images(self, file_paths: List[str], show_progress: bool = True) -> List[Dict[str, Any]]:
         """Process standalone images not part of the main clinical dataset"""
         if not file_paths:
@@ -485,15 +1003,14 @@ class IngestionManager:
         print("   Note: Images should be linked via the clinical dataset Excel file.")
         
         results = []
+        self._get_clinical_context.cache_clear()
         
         if show_progress:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            progress = self._start_progress()
         
         for i, file_path in enumerate(file_paths):
             if show_progress:
-                progress_bar.progress((i + 1) / len(file_paths))
-                status_text.text(f"Processing {os.path.basename(file_path)}...")
+                self._maybe_update_progress(i, len(file_paths), os.path.basename(file_path), progress)
             
             result = self.process_single_image(file_path)
             results.append(result)
@@ -509,8 +1026,8 @@ class IngestionManager:
                 print(f"❌ {os.path.basename(file_path)}: {result['message']}")
         
         if show_progress:
-            progress_bar.empty()
-            status_text.empty()
+            progress['progress_bar'].empty()
+            progress['status_text'].empty()
         
         return results
     
@@ -522,13 +1039,11 @@ class IngestionManager:
         results = []
         
         if show_progress:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            progress = self._start_progress()
         
         for i, file_path in enumerate(file_paths):
             if show_progress:
-                progress_bar.progress((i + 1) / len(file_paths))
-                status_text.text(f"Processing {os.path.basename(file_path)}...")
+                self._maybe_update_progress(i, len(file_paths), os.path.basename(file_path), progress)
             
             result = self.process_single_document(file_path)
             results.append(result)
@@ -549,8 +1064,8 @@ class IngestionManager:
                 print(f"❌ {os.path.basename(file_path)}: {result['message']}")
         
         if show_progress:
-            progress_bar.empty()
-            status_text.empty()
+            progress['progress_bar'].empty()
+            progress['status_text'].empty()
         
         return results
     
@@ -608,12 +1123,17 @@ class IngestionManager:
         """Get summary of ingestion status and dataset information"""
         stats = self.db.get_stats()
         
+        # Look up the processing status of every candidate file in one query
+        documents_listing = self._list_documents_dir()
+        candidate_paths = self._candidate_document_paths(documents_listing)
+        processed = self.db.get_processed_set(candidate_paths)
+        
         # Check if main dataset file exists and when it was last processed
         excel_file_processed = False
         excel_file_info = "Not found"
         
         if self.excel_file_path.exists():
-            excel_file_processed = self.db.is_file_processed(str(self.excel_file_path))
+            excel_file_processed = str(self.excel_file_path) in processed
             file_size = self.excel_file_path.stat().st_size / 1024  # KB
             excel_file_info = f"Found ({file_size:.1f} KB)"
             if excel_file_processed:
@@ -621,42 +1141,20 @@ class IngestionManager:
             else:
                 excel_file_info += " - Needs Processing ⚠️"
         
-        # Check for files that need processing
-        files_to_process = self.get_files_to_process()
-        total_pending_files = sum(len(files) for files in files_to_process.values())
+        # Check for files that need processing (images are handled via the Excel dataset)
+        total_pending_files = sum(1 for file_path in candidate_paths if file_path not in processed)
         
         # Check for additional document files (DOCX and PDF)
         additional_docs = []
-        documents_dir = self.dataset_path / "documents"
-        
-        # Check for DOCX files
-        if documents_dir.exists():
-            for file_path in documents_dir.glob("*.docx"):
-                if file_path.is_file() and file_path != self.excel_file_path:
-                    ext = file_path.suffix.lower()
-                    if ext in self.supported_extensions['documents']:
-                        processed = self.db.is_file_processed(str(file_path))
-                        additional_docs.append({
-                            'name': file_path.name,
-                            'size_kb': file_path.stat().st_size / 1024,
-                            'processed': processed,
-                            'type': 'DOCX'
-                        })
-        
-        # Check for PDF files in the documents directory
-        pdfs_dir = self.dataset_path / "documents"  # Update directory to "documents" for PDFs as well
-        if pdfs_dir.exists():
-            for file_path in pdfs_dir.glob("*.pdf"):  # Only look for PDF files in the "documents" folder
-                if file_path.is_file():
-                    ext = file_path.suffix.lower()
-                    if ext in self.supported_extensions['documents']:
-                        processed = self.db.is_file_processed(str(file_path))
-                        additional_docs.append({
-                            'name': file_path.name,
-                            'size_kb': file_path.stat().st_size / 1024,
-                            'processed': processed,
-                            'type': 'PDF'
-                        })
+        for suffix, doc_type in (('.docx', 'DOCX'), ('.pdf', 'PDF')):
+            for name, file_path, size, ext in documents_listing:
+                if ext == suffix:
+                    additional_docs.append({
+                        'name': name,
+                        'size_kb': size / 1024,
+                        'processed': file_path in processed,
+                        'type': doc_type
+                    })
         
         # Return the summary dictionary
         return {
@@ -674,37 +1172,38 @@ class IngestionManager:
             },
             'pending_processing': {
                 'total_files': total_pending_files,
-                'documents': len(files_to_process['documents']),
-                'images': len(files_to_process['images']),
+                'documents': total_pending_files,
+                'images': 0,
                 'needs_processing': total_pending_files > 0
             }
         }
     
-    def force_reprocess_all(self) -> Dict[str, Any]:
-        """Force reprocessing of the entire dataset"""
+    def force_reprocess_all(self, clear_chat: bool = False) -> Dict[str, Any]:
+        """Force reprocessing of the entire dataset, keeping chat history unless clear_chat is set"""
         print("🔄 Forcing complete reprocessing of dataset...")
         
-        # Clear file processing status for the main Excel file
+        # Drop cached and memoized analyses so every image is sent to the current vision providers again
+        self.processor.clear_cache()
+        
+        # Chat history is user-generated rather than derived from the dataset, so it is only wiped on request
+        tables = ['images', 'documents', 'patients'] + (['chat_sessions'] if clear_chat else []) + ['file_status']
+        
+        # Clear all patient, document, image and file processing data in one transaction. The tables
+        # have no triggers, so with foreign key enforcement off each unqualified DELETE takes SQLite's
+        # truncate fast path instead of deleting row by row; ids restart along with the data
+        deletes = "".join(f"DELETE FROM {table};\n" for table in tables)
+        table_names = ", ".join(f"'{table}'" for table in tables)
+        with self.db.connect() as conn:
+            conn.executescript(
+                "PRAGMA foreign_keys=OFF;\n"
+                "BEGIN IMMEDIATE;\n"
+                f"{deletes}"
+                f"DELETE FROM sqlite_sequence WHERE name IN ({table_names});\n"
+                "COMMIT;\n"
+            )
+        
         if self.excel_file_path.exists():
-            import sqlite3
-            with sqlite3.connect(self.db.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM file_status WHERE file_path = ?', (str(self.excel_file_path),))
-                conn.commit()
-            
             print(f"✅ Cleared processing status for {self.excel_file_path.name}")
-        
-        # Clear all patient, document, and image data
-        import sqlite3
-        with sqlite3.connect(self.db.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM images')
-            cursor.execute('DELETE FROM documents') 
-            cursor.execute('DELETE FROM patients')
-            cursor.execute('DELETE FROM chat_sessions')
-            cursor.execute('DELETE FROM file_status')  # Clear all file processing status
-            conn.commit()
-            
         print("✅ Cleared all existing data from database")
         
         # Run full ingestion
@@ -728,13 +1227,13 @@ class IngestionManager:
         for img in patient_data['images']:
             file_paths.append(img['metadata'].get('source', ''))
         
-        # Clear processing status for these files
-        import sqlite3
-        with sqlite3.connect(self.db.db_path) as conn:
+        # Clear processing status for these files, in chunks under SQLite's bound-parameter limit
+        source_paths = list(dict.fromkeys(path for path in file_paths if path))
+        with self.db.connect() as conn:
             cursor = conn.cursor()
-            for file_path in file_paths:
-                if file_path:
-                    cursor.execute('DELETE FROM file_status WHERE file_path = ?', (file_path,))
+            for start in range(0, len(source_paths), 500):
+                chunk = source_paths[start:start + 500]
+                cursor.execute(f'DELETE FROM file_status WHERE file_path IN ({",".join("?" * len(chunk))})', chunk)
             conn.commit()
         
         print(f"Cleared processing status for {len(file_paths)} files belonging to patient {patient_name}")
@@ -742,131 +1241,74 @@ class IngestionManager:
         # Reprocess
         return self.full_ingestion()
     
+    def _analyze_folders(self, files: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Walk categorized file paths once, collecting per-folder counts, file types and patient folders"""
+        folders = {}
+        file_types = {}
+        patient_folders = []
+        
+        # The lists are already categorized by extension, so the counter slot is resolved once per list
+        for category, file_list in files.items():
+            slot = _FOLDER_SUMMARY_SLOTS.get(category, 2)
+            for file_path in file_list:
+                folder = self._dataset_relative_folder(file_path)
+                details = folders.get(folder)
+                if details is None:
+                    # Check once per folder whether this might be a patient folder
+                    folder_lower = folder.lower()
+                    potential_patient_folder = any(keyword in folder_lower for keyword in _PATIENT_FOLDER_KEYWORDS)
+                    details = folders[folder] = {
+                        'counts': [0, 0, 0],  # documents, images, other
+                        'file_count': 0,
+                        'file_types': set(),
+                        'potential_patient_folder': potential_patient_folder
+                    }
+                    if potential_patient_folder:
+                        patient_folders.append(folder)
+                
+                ext = _file_extension(file_path.rpartition(os.sep)[2])
+                details['counts'][slot] += 1
+                details['file_count'] += 1
+                details['file_types'].add(ext)
+                file_types[ext] = file_types.get(ext, 0) + 1
+        
+        return {'folders': folders, 'file_types': file_types, 'patient_folders': patient_folders}
+    
     def _print_folder_summary(self, files_to_process: Dict[str, List[str]]):
         """Print a summary of the folder structure being processed"""
         if not any(files_to_process.values()):
             return
         
-        folder_summary = {}
-        all_files = []
-        for file_list in files_to_process.values():
-            all_files.extend(file_list)
-        
-        # Analyze folder structure
-        for file_path in all_files:
-            relative_path = Path(file_path).relative_to(self.dataset_path)
-            folder_path = relative_path.parent
-            
-            if folder_path not in folder_summary:
-                folder_summary[folder_path] = {'documents': 0, 'images': 0}
-            
-            ext = Path(file_path).suffix.lower()
-            if ext in self.supported_extensions['documents']:
-                folder_summary[folder_path]['documents'] += 1
-            elif ext in self.supported_extensions['images']:
-                folder_summary[folder_path]['images'] += 1
-        
-        print("\n📁 Folder Structure Summary:")
-        for folder, counts in sorted(folder_summary.items()):
-            folder_str = str(folder) if str(folder) != '.' else '(root)'
-            total_files = counts['documents'] + counts['images']
-            print(f"   {folder_str}: {total_files} files ({counts['documents']} docs, {counts['images']} images)")
-    
-    def get_folder_structure_info(self) -> Dict[str, Any]:
-        """Get detailed information about the dataset folder structure"""
-        all_files = self.scan_dataset_folder()
+        folders = self._analyze_folders(files_to_process)['folders']
         
-        structure_info = {
-            'total_folders': set(),
-            'folder_details': {},
-            'file_types': {},
-            'patient_folders': []
-        }
+        # Format every folder line first and print them in one call
+        lines = ["\n📁 Folder Structure Summary:"]
+        for folder, details in sorted(folders.items()):
+            documents, images, _ = details['counts']
+            folder_str = folder if folder != '.' else '(root)'
+            lines.append(f"   {folder_str}: {documents + images} files ({documents} docs, {images} images)")
+        print("\n".join(lines))
+    
+    def get_folder_structure_info(self, all_files: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """Get detailed information about the dataset folder structure (scanning unless given a scan result)"""
+        if all_files is None:
+            all_files = self.scan_dataset_folder()
         
-        all_file_paths = []
-        for file_list in all_files.values():
-            all_file_paths.extend(file_list)
-        
-        for file_path in all_file_paths:
-            relative_path = Path(file_path).relative_to(self.dataset_path)
-            folder_path = relative_path.parent
-            structure_info['total_folders'].add(str(folder_path))
-            
-            # Track file types
-            ext = Path(file_path).suffix.lower()
-            structure_info['file_types'][ext] = structure_info['file_types'].get(ext, 0) + 1
-            
-            # Track folder details
-            folder_str = str(folder_path)
-            if folder_str not in structure_info['folder_details']:
-                structure_info['folder_details'][folder_str] = {
-                    'file_count': 0,
-                    'file_types': set(),
-                    'potential_patient_folder': False
+        analysis = self._analyze_folders(all_files)
+        return {
+            'total_folders': len(analysis['folders']),
+            'folder_details': {
+                folder: {
+                    'file_count': details['file_count'],
+                    'file_types': details['file_types'],
+                    'potential_patient_folder': details['potential_patient_folder']
                 }
-            
-            structure_info['folder_details'][folder_str]['file_count'] += 1
-            structure_info['folder_details'][folder_str]['file_types'].add(ext)
-            
-            # Check if this might be a patient folder
-            folder_lower = folder_str.lower()
-            if any(keyword in folder_lower for keyword in ['patient', 'episode', 'case', 'record']):
-                structure_info['folder_details'][folder_str]['potential_patient_folder'] = True
-                if folder_str not in structure_info['patient_folders']:
-                    structure_info['patient_folders'].append(folder_str)
-        
-        structure_info['total_folders'] = len(structure_info['total_folders'])
-        
-        return structure_info
+                for folder, details in analysis['folders'].items()
+            },
+            'file_types': analysis['file_types'],
+            'patient_folders': analysis['patient_folders']
+        }
     
     def _extract_patient_from_filename(self, file_path: str) -> str:
         """Extract patient name from filename or folder structure as fallback"""
-        filename = os.path.basename(file_path)
-        path_parts = Path(file_path).parts
-        
-        # Try to extract patient info from various folder naming patterns
-        for part in path_parts:
-            part_lower = part.lower()
-            
-            # Look for patterns indicating patient folders
-            if any(keyword in part_lower for keyword in ['episode', 'patient', 'case', 'record']):
-                # Extract patient name from episode/patient folder
-                patient_name = part.replace('_Episode', '').replace('_Patient', '').replace('_Case', '').replace('_Record', '')
-                patient_name = patient_name.replace('_', ' ').replace('-', ' ').strip()
-                if patient_name and len(patient_name) > 2:  # Valid name
-                    return patient_name
-        
-        # Try to extract from filename patterns
-        filename_base = os.path.splitext(filename)[0]
-        
-        # Look for patient name patterns in filename (e.g., "PatientName_date.docx")
-        if '_' in filename_base:
-            parts = filename_base.split('_')
-            # If first part looks like a name (contains letters, reasonable length)
-            if parts[0] and len(parts[0]) > 2 and any(c.isalpha() for c in parts[0]):
-                potential_name = parts[0].replace('-', ' ').strip()
-                return potential_name
-        
-        # Look for space-separated names in filename
-        if ' ' in filename_base:
-            words = filename_base.split()
-            # Take first few words that look like names
-            name_words = []
-            for word in words[:3]:  # Maximum 3 words for name
-                if word and len(word) > 1 and any(c.isalpha() for c in word):
-                    name_words.append(word)
-                else:
-                    break
-            if name_words:
-                return ' '.join(name_words)
-        
-        # Check if any folder in the path could be a patient identifier
-        for part in path_parts[:-1]:  # Exclude the filename itself
-            # Skip common folder names
-            skip_folders = {'dataset', 'documents', 'images', 'files', 'data', 'medical', 'records', 'reports'}
-            if part.lower() not in skip_folders and len(part) > 2:
-                # This could be a patient folder
-                return part.replace('_', ' ').replace('-', ' ').strip()
-        
-        # Final fallback: use filename without extension
-        return filename_base.replace('_', ' ').replace('-', ' ').strip() or 'Unknown Patient' 
\ No newline at end of file
+        return _patient_name_from_path(file_path)
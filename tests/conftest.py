@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Tests import the app modules as the `src` package, like app.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.database_manager import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A DatabaseManager backed by a fresh SQLite file"""
+    return DatabaseManager(str(tmp_path / "test.db"))
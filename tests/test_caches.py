@@ -0,0 +1,89 @@
+import os
+import time
+
+from src import ingestion_manager
+from src.document_processor import _LRUCache
+from src.ingestion_manager import _scandir_recursive
+
+
+def test_lru_cache_evicts_least_recently_used_past_byte_bound():
+    cache = _LRUCache(maxsize=10, max_bytes=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    cache.get('a')
+    cache.put('c', b'1234')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1234' and cache.get('c') == b'1234'
+    assert cache._bytes == 8
+
+
+def test_lru_cache_replacing_a_key_updates_its_size():
+    cache = _LRUCache(maxsize=10, max_bytes=10)
+    cache.put('a', b'123456')
+    cache.put('a', b'12')
+    cache.put('b', b'12345678')
+    assert cache.get('a') == b'12' and cache._bytes == 10
+
+
+def test_lru_cache_keeps_a_single_oversized_entry():
+    cache = _LRUCache(maxsize=10, max_bytes=4)
+    cache.put('a', b'123')
+    cache.put('big', b'123456789')
+    assert cache.get('a') is None
+    assert cache.get('big') == b'123456789'
+
+
+def test_lru_cache_count_bound():
+    cache = _LRUCache(maxsize=2)
+    for key in 'abc':
+        cache.put(key, key)
+    assert cache.get('a') is None and cache.get('c') == 'c'
+
+
+def _age(*paths, seconds=60):
+    """Backdate directory mtimes so their listings are outside the settle window"""
+    past = time.time() - seconds
+    for path in paths:
+        os.utime(path, (past, past))
+
+
+def _scan(path, cache):
+    return sorted(_scandir_recursive(str(path), cache))
+
+
+def test_scandir_cache_reuses_unchanged_listings(tmp_path, monkeypatch):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.TXT").write_text("a")
+    (tmp_path / "sub" / "b.png").write_text("b")
+    _age(tmp_path, tmp_path / "sub")
+    cache = {}
+    first = _scan(tmp_path, cache)
+    assert first == [(str(tmp_path / "a.TXT"), '.txt'), (str(tmp_path / "sub" / "b.png"), '.png')]
+    assert set(cache) == {str(tmp_path), str(tmp_path / "sub")}
+    
+    def fail_scandir(path):
+        raise AssertionError(f"rescanned {path}")
+    monkeypatch.setattr(ingestion_manager.os, 'scandir', fail_scandir)
+    assert _scan(tmp_path, cache) == first
+
+
+def test_scandir_cache_rescans_changed_directory(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.png").write_text("b")
+    _age(tmp_path, tmp_path / "sub")
+    cache = {}
+    _scan(tmp_path, cache)
+    
+    (tmp_path / "sub" / "c.jpg").write_text("c")
+    assert (str(tmp_path / "sub" / "c.jpg"), '.jpg') in _scan(tmp_path, cache)
+    # The directory was just modified, so its new listing is not cached until it settles
+    assert cache[str(tmp_path / "sub")][1] == [(str(tmp_path / "sub" / "b.png"), '.png')]
+    
+    (tmp_path / "sub" / "b.png").unlink()
+    assert _scan(tmp_path, cache) == [(str(tmp_path / "sub" / "c.jpg"), '.jpg')]
+
+
+def test_scandir_without_cache(tmp_path):
+    (tmp_path / "a.pdf").write_text("a")
+    (tmp_path / "noext").write_text("b")
+    assert _scan(tmp_path, None) == [(str(tmp_path / "a.pdf"), '.pdf'), (str(tmp_path / "noext"), '')]
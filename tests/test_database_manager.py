@@ -0,0 +1,33 @@
+import os
+import sqlite3
+
+from src import database_manager
+
+
+def test_get_processed_set_queries_in_chunks(db, tmp_path, monkeypatch):
+    paths = []
+    for number in range(1200):
+        path = tmp_path / f"doc_{number}.txt"
+        path.write_text(f"document {number}")
+        paths.append(str(path))
+    for path in paths[:1100]:
+        db.mark_file_processed(path)
+    
+    # A changed file is no longer processed, even though it has a file_status row
+    with open(paths[3], 'w') as f:
+        f.write("edited")
+    os.utime(paths[3], (0, 0))
+    
+    # Cap bound parameters well below the path count so an unchunked IN query would fail
+    connect = sqlite3.connect
+    def limited_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 600)
+        return conn
+    monkeypatch.setattr(database_manager.sqlite3, 'connect', limited_connect)
+    
+    assert db.get_processed_set(paths) == set(paths[:1100]) - {paths[3]}
+
+
+def test_get_processed_set_empty(db):
+    assert db.get_processed_set([]) == set()
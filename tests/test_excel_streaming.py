@@ -0,0 +1,82 @@
+import math
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from src.ingestion_manager import _excel_cell_value, _iter_excel_rows
+
+COLUMNS = ['PatientID', 'Name', 'Age', 'Score', 'Visits', 'Code', 'Notes']
+
+
+def _write_workbook(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def _assert_matches_read_excel(path, columns):
+    expected = pd.read_excel(path)
+    rows = list(_iter_excel_rows(path, frozenset(columns)))
+    assert len(rows) == len(expected)
+    for position, row in enumerate(rows):
+        for column in columns:
+            want, got = expected[column].iloc[position], row[column]
+            if pd.isna(want):
+                assert isinstance(got, float) and math.isnan(got), (position, column)
+            else:
+                assert str(got) == str(want), (position, column)
+
+
+def test_blank_numeric_cells_match_read_excel(tmp_path):
+    path = _write_workbook(tmp_path / "blanks.xlsx", [
+        COLUMNS,
+        [12345, 'Jane Doe', 45, 1.5, 3, '00123', 'ok'],
+        [None, 'John Roe', 50, 2, 4, '00124', None],
+        [12347, 'NA', None, 3, 5, 7, 'x'],
+        [12348, '', 60, None, 6, 'x', 'y'],
+    ])
+    _assert_matches_read_excel(path, COLUMNS)
+
+
+def test_patient_id_with_blank_cell_reads_as_float(tmp_path):
+    path = _write_workbook(tmp_path / "ids.xlsx", [
+        ['PatientID', 'Name'],
+        [12345, 'Jane Doe'],
+        [None, 'John Roe'],
+    ])
+    rows = list(_iter_excel_rows(path, frozenset(['PatientID', 'Name'])))
+    assert str(rows[0]['PatientID']) == '12345.0'
+
+
+def test_blank_rows_become_nan_except_trailing(tmp_path):
+    path = _write_workbook(tmp_path / "gaps.xlsx", [
+        ['PatientID', 'Name'],
+        [1, 'Jane Doe'],
+        [],
+        [3, 'John Roe'],
+        [],
+        [],
+    ])
+    _assert_matches_read_excel(path, ['PatientID', 'Name'])
+    assert len(list(_iter_excel_rows(path, frozenset(['PatientID', 'Name'])))) == 3
+
+
+def test_unrequested_columns_are_not_read(tmp_path):
+    path = _write_workbook(tmp_path / "subset.xlsx", [COLUMNS, [1, 'Jane Doe', 45, 1.5, 3, 'a', 'b']])
+    rows = list(_iter_excel_rows(path, frozenset(['Name', 'Age'])))
+    assert rows == [{'Name': 'Jane Doe', 'Age': 45}]
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 'nan'), ('NA', 'nan'), ('', 'nan'), (3.0, 3), (2.5, 2.5), ('text', 'text'),
+])
+def test_excel_cell_value(value, expected):
+    result = _excel_cell_value(value)
+    if expected == 'nan':
+        assert math.isnan(result)
+    else:
+        assert result == expected and type(result) is type(expected)
@@ -0,0 +1,49 @@
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.ingestion_manager import IngestionManager
+
+
+@pytest.fixture
+def manager(db, tmp_path, monkeypatch):
+    # IngestionManager creates its dataset folders under the working directory
+    monkeypatch.chdir(tmp_path)
+    manager = IngestionManager(db, MagicMock())
+    monkeypatch.setattr(manager, 'full_ingestion', lambda show_progress=False: {'status': 'success'})
+    return manager
+
+
+def _populate(db, tmp_path):
+    document = tmp_path / "note.txt"
+    document.write_text("note")
+    patient_uuid = db.find_or_create_patient("Jane Doe", "12345")
+    db.add_document(patient_uuid, str(document), "content", "processed", {})
+    db.add_image(patient_uuid, str(document), "transcription", "X", {})
+    db.mark_file_processed(str(document))
+    db.add_chat_message("session", "question", "answer")
+
+
+def _count(db, table):
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_force_reprocess_all_keeps_chat_history(manager, db, tmp_path):
+    _populate(db, tmp_path)
+    assert manager.force_reprocess_all() == {'status': 'success'}
+    
+    manager.processor.clear_cache.assert_called_once()
+    for table in ('patients', 'documents', 'images', 'file_status'):
+        assert _count(db, table) == 0
+    assert _count(db, 'chat_sessions') == 1
+    # Ids restart with the cleared data
+    assert db.find_or_create_patient("John Roe", "1") == 1
+
+
+def test_force_reprocess_all_clear_chat(manager, db, tmp_path):
+    _populate(db, tmp_path)
+    manager.force_reprocess_all(clear_chat=True)
+    assert _count(db, 'chat_sessions') == 0
+    assert _count(db, 'patients') == 0